@@ -3,10 +3,25 @@
 import os
 import sys
 
+# ORM scripts run from cron only need practice_orm, see orm/settings_lean.py.
+LEAN_COMMANDS = {
+    'runorm',
+    'mass_update',
+    'refresh_rollups',
+    'rebuild_sketches',
+    'archive_books',
+    'restore_books',
+    'verify_archive',
+    'rebalance_books',
+    'compact_changes',
+    'bench_aggregate',
+}
+
 
 def main():
     """Run administrative tasks."""
-    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orm.settings')
+    lean = len(sys.argv) > 1 and sys.argv[1] in LEAN_COMMANDS
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'orm.settings_lean' if lean else 'orm.settings')
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'practice_orm.loaders.LoaderMiddleware',
 ]
 
 ROOT_URLCONF = 'orm.urls'
@@ -82,6 +84,47 @@ DATABASES = {
     }
 }
 
+# Books are partitioned by publisher across these aliases (see practice_orm/sharding.py).
+# 'default' is always the first shard, BOOKS_SHARD_COUNT=1 disables sharding.
+# BOOKS_SHARD_ALIASES lists every shard database in pk range order, in use or
+# not, so a shard dropped by lowering the count can still be drained.
+
+BOOKS_SHARD_COUNT = int(os.environ.get('BOOKS_SHARD_COUNT', 1))
+
+BOOKS_SHARD_ALIASES = ['default'] + ['books_shard_%d' % i for i in range(1, max(BOOKS_SHARD_COUNT, 4))]
+
+BOOKS_SHARDS = BOOKS_SHARD_ALIASES[:BOOKS_SHARD_COUNT]
+
+for alias in BOOKS_SHARD_ALIASES[1:]:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / ('%s.sqlite3' % alias),
+    }
+
+# Books published before the archive cutoff can be moved to the BOOKS_ARCHIVE_ALIAS
+# database (see practice_orm/archive.py). Like the shards it is opt-in: migrate it
+# with `manage.py migrate --database archive`, then set BOOKS_ARCHIVE=1.
+# BOOKS_ARCHIVE_DATABASE is the archive in use, None while it is switched off.
+
+BOOKS_ARCHIVE_ALIAS = 'archive'
+
+BOOKS_ARCHIVE_DATABASE = BOOKS_ARCHIVE_ALIAS if os.environ.get('BOOKS_ARCHIVE') == '1' else None
+
+DATABASES[BOOKS_ARCHIVE_ALIAS] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'archive.sqlite3',
+}
+
+# Scratch database of `manage.py bench_aggregate`, which fills it with up to a
+# million Books. Nothing else uses it.
+
+DATABASES['bench'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'bench.sqlite3',
+}
+
+DATABASE_ROUTERS = ['practice_orm.sharding.BooksShardRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -123,3 +166,7 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Tests run against a migrated and seeded template database (see practice_orm/testing.py).
+
+TEST_RUNNER = 'practice_orm.testing.SnapshotTestRunner'
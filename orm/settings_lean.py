@@ -0,0 +1,27 @@
+"""
+Lean settings for ORM scripts and cron jobs.
+
+Loads practice_orm and nothing else: no admin, auth, sessions, messages or
+staticfiles, no middleware or templates and no translation machinery. The
+practice_orm models don't relate to any contrib app, so every ORM command
+works the same, it just starts faster. manage.py picks these settings for
+the commands in LEAN_COMMANDS unless DJANGO_SETTINGS_MODULE is set.
+"""
+
+from orm.settings import *  # noqa: F401,F403
+
+
+INSTALLED_APPS = [
+    'practice_orm',
+]
+
+MIDDLEWARE = []
+
+TEMPLATES = []
+
+AUTH_PASSWORD_VALIDATORS = []
+
+USE_I18N = False
+
+# orm.urls mounts the admin, which isn't installed here. Nothing is served.
+ROOT_URLCONF = None
@@ -0,0 +1,87 @@
+"""
+Aggregates that can be computed in parts and merged.
+
+Scatter-gather over shards and parallel execution over pk ranges both run the
+same aggregate on several slices of a table. Most aggregates can't simply be
+re-aggregated: the average of averages is wrong, and distinct counts overlap
+between slices. `partial_aggregate()` rewrites each aggregate into parts that
+merge exactly and `combine()` merges them:
+
+    Sum, Count   -> summed
+    Min, Max     -> min/max of the parts
+    Avg          -> Sum and Count of the column, divided at the end
+    Count, Sum, Avg with distinct=True
+                 -> set of distinct values, unioned and then counted,
+                    summed or averaged at the end
+
+    parts = [partial_aggregate(qs.using(alias), avg=Avg('price')) for alias in aliases]
+    combine(parts, avg=Avg('price'))  # {'avg': ...}
+"""
+
+from django.db.models import Avg, Count, Max, Min, Sum
+
+
+def _named(args, kwargs):
+    aggregates = dict(kwargs)
+    for arg in args:
+        aggregates[arg.default_alias] = arg
+    return aggregates
+
+
+def partial_aggregate(queryset, *args, **kwargs):
+    """Run the mergeable parts of the given aggregates over `queryset`."""
+    aggregates = _named(args, kwargs)
+    parts = {}
+    distinct = {}
+    for name, aggregate in aggregates.items():
+        expression = aggregate.get_source_expressions()[0]
+        if isinstance(aggregate, (Count, Sum, Avg)) and aggregate.distinct:
+            distinct[name] = (expression, aggregate.filter)
+        elif isinstance(aggregate, Avg):
+            parts[name + '__sum'] = Sum(expression, filter=aggregate.filter)
+            parts[name + '__count'] = Count(expression, filter=aggregate.filter)
+        elif isinstance(aggregate, (Sum, Count, Min, Max)):
+            parts[name] = aggregate
+        else:
+            raise TypeError('%s can not be merged across partitions.' % aggregate.__class__.__name__)
+
+    result = queryset.aggregate(**parts) if parts else {}
+    for name, (expression, condition) in distinct.items():
+        values = queryset.filter(condition) if condition is not None else queryset
+        result[name] = set(values.order_by().values_list(expression, flat=True).distinct()) - {None}
+    return result
+
+
+def combine(partials, *args, **kwargs):
+    """Merge the results of `partial_aggregate()` calls for the same aggregates."""
+    aggregates = _named(args, kwargs)
+    partials = list(partials)
+    result = {}
+    for name, aggregate in aggregates.items():
+        if isinstance(aggregate, (Count, Sum, Avg)) and aggregate.distinct:
+            values = set().union(*(p[name] for p in partials))
+            if isinstance(aggregate, Count):
+                result[name] = len(values)
+            elif not values:
+                result[name] = None
+            elif isinstance(aggregate, Sum):
+                result[name] = sum(values)
+            else:
+                result[name] = sum(values) / len(values)
+        elif isinstance(aggregate, Avg):
+            total = sum(p[name + '__sum'] or 0 for p in partials)
+            count = sum(p[name + '__count'] for p in partials)
+            result[name] = total / count if count else None
+        elif isinstance(aggregate, Count):
+            result[name] = sum(p[name] for p in partials)
+        else:
+            values = [p[name] for p in partials if p[name] is not None]
+            if not values:
+                result[name] = None
+            elif isinstance(aggregate, Sum):
+                result[name] = sum(values)
+            elif isinstance(aggregate, Min):
+                result[name] = min(values)
+            else:
+                result[name] = max(values)
+    return result
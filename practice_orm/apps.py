@@ -4,3 +4,21 @@ from django.apps import AppConfig
 class PracticeOrmConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'practice_orm'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_delete, post_init, post_migrate, post_save, pre_delete
+
+        from practice_orm import cdc, sharding, sketches, temporal
+        from practice_orm.models import Author, Publisher
+
+        connection_created.connect(sharding.disable_foreign_keys)
+        post_migrate.connect(sharding.reserve_pk_range, sender=self)
+        post_migrate.connect(cdc.install_triggers, sender=self)
+        for model in (Author, Publisher):
+            pre_delete.connect(sharding.cascade_remote_books, sender=model)
+        for model in {model for model, column in sketches.TRACKED.values()}:
+            post_init.connect(sketches.remember_values, sender=model)
+            post_save.connect(sketches.record_saved, sender=model)
+            post_delete.connect(sketches.record_deleted, sender=model)
+        temporal.register_lookups()
@@ -0,0 +1,355 @@
+"""
+Archive tier for old Books.
+
+Old titles are rarely read, but every scan and index of practice_orm_books
+pays for them. `archive_books(before)` moves the books published before a
+cutoff from the hot databases ('default' and any Books shards) to
+`settings.BOOKS_ARCHIVE_DATABASE`, in chunks that each commit atomically
+(see sharding.transfer_books). Rows keep their primary key, so they can be
+verified and restored.
+
+The archive is switched off until its database is migrated and
+BOOKS_ARCHIVE=1 is set for every process (the web server included, which
+cascades deletes to it):
+
+    python manage.py migrate --database archive
+    export BOOKS_ARCHIVE=1
+
+Without it, everything that reads Books across databases only reads the hot
+ones and the functions below raise ValueError.
+
+`Books.objects` only ever sees hot rows. History has to be asked for:
+
+    Books.objects.filter(genre='Poetry').including_archive().count()
+    for book in Books.objects.filter(author=author).including_archive():
+        ...
+
+`including_archive()` runs the query on every hot alias and on the archive
+and returns the union of the results (UNION ALL: a book lives in exactly one
+place). Counts and aggregates are merged with practice_orm.aggregates.
+Values rows of a distinct() query can repeat across the databases and are
+deduplicated, so their count() fetches the rows. Grouped values() rows
+(`values('genre').annotate(n=Count('pk'))`) would need their aggregates
+merged per group and raise NotSupportedError, as does aggregate() over a
+distinct() query.
+Without order_by() iteration yields hot rows first; with an ordering on
+Books columns the sorted parts are merged, so slices like
+`.order_by('-published_date')[:10]` are global.
+
+The shards and the archive only have the Books table. Keyword lookups
+through author or publisher (`filter(author__lastname='Rana')`) are resolved
+to ids on 'default' first, `select_related('author')` becomes a prefetch
+on the other databases, and any other join raises NotSupportedError.
+
+    manage.py archive_books --before 2000-01-01
+    manage.py verify_archive --before 2000-01-01
+    manage.py restore_books --since 1995-01-01
+"""
+
+import heapq
+import itertools
+from operator import attrgetter, itemgetter
+
+from django.db import NotSupportedError, connections
+from django.db.models import F
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.query import FlatValuesListIterable, ModelIterable, ValuesIterable, ValuesListIterable
+from django.db.models.sql.datastructures import Join
+
+from practice_orm.aggregates import combine, partial_aggregate
+from practice_orm.models import Author, Books, Publisher
+from practice_orm.sharding import archive_alias, shard_aliases, shard_for, transfer_books
+
+
+def _archive():
+    alias = archive_alias()
+    if alias is None:
+        raise ValueError(
+            'The archive is switched off: run `manage.py migrate --database archive` and set BOOKS_ARCHIVE=1.'
+        )
+    return alias
+
+
+def _date_param(alias, value):
+    return connections[alias].ops.adapt_datefield_value(value)
+
+
+def archive_books(before, chunk_size=1000):
+    """Move books published before `before` to the archive. Returns {hot alias: rows moved}."""
+    archive = _archive()
+    return {
+        alias: transfer_books(
+            alias, archive, 'published_date < %s', [_date_param(alias, before)],
+            chunk_size, keep_pk=True,
+        )
+        for alias in shard_aliases()
+    }
+
+
+def restore_books(since=None, ids=None, chunk_size=1000):
+    """
+    Move archived books back to the hot shard of their publisher, either the
+    ones published on or after `since` or the given `ids`. Returns the number
+    of rows moved.
+    """
+    if since is None and ids is None:
+        raise ValueError('restore_books() needs `since` or `ids`.')
+    archive = _archive()
+    archived = Books.objects.using(archive).all()
+    where, params = [], []
+    if since is not None:
+        archived = archived.filter(published_date__gte=since)
+        where.append('published_date >= %s')
+        params.append(_date_param(archive, since))
+    if ids is not None:
+        ids = list(ids)
+        archived = archived.filter(pk__in=ids)
+        where.append('id IN (%s)' % ', '.join(['%s'] * len(ids)))
+        params.extend(ids)
+
+    restored = 0
+    publishers = list(archived.order_by().values_list('publisher_id', flat=True).distinct())
+    for publisher_id in publishers:
+        restored += transfer_books(
+            archive, shard_for(publisher_id), ' AND '.join(['publisher_id = %s'] + where),
+            [publisher_id] + params, chunk_size, keep_pk=True,
+        )
+    return restored
+
+
+def verify_archive(before=None, chunk_size=1000):
+    """Count the inconsistencies between the hot databases and the archive."""
+    archive = Books.objects.using(_archive()).order_by('pk')
+    report = {'archived': archive.count(), 'duplicates': 0, 'orphans': 0}
+
+    last = None
+    while True:
+        chunk = archive if last is None else archive.filter(pk__gt=last)
+        rows = list(chunk.values_list('pk', 'author_id', 'publisher_id')[:chunk_size])
+        if not rows:
+            break
+        last = rows[-1][0]
+        pks = [pk for pk, _, _ in rows]
+        for alias in shard_aliases():
+            report['duplicates'] += Books.objects.using(alias).filter(pk__in=pks).count()
+        authors = {a for _, a, _ in rows}
+        publishers = {p for _, _, p in rows}
+        report['orphans'] += (
+            len(authors) - Author.objects.filter(pk__in=authors).count()
+            + len(publishers) - Publisher.objects.filter(pk__in=publishers).count()
+        )
+
+    if before is not None:
+        report['not_archived'] = sum(
+            Books.objects.using(alias).filter(published_date__lt=before).count() for alias in shard_aliases()
+        )
+        report['newer_than_cutoff'] = archive.filter(published_date__gte=before).count()
+    return report
+
+
+def resolve_related_lookups(kwargs):
+    """
+    Rewrite Books lookups through author or publisher into `<fk>__in` with
+    the matching ids from 'default', e.g. `author__lastname='Rana'` into
+    `author__in=[...]`. Lookups on the same relation are resolved together.
+    """
+    plain, related = {}, {}
+    for key, value in kwargs.items():
+        name, _, rest = key.partition(LOOKUP_SEP)
+        field = Books._meta.get_field(name) if name in ('author', 'publisher') else None
+        first = rest.split(LOOKUP_SEP)[0]
+        if field is None or not rest or first in ('pk', field.target_field.name) or field.get_lookup(first):
+            plain[key] = value
+        else:
+            related.setdefault(field, {})[rest] = value
+    for field, lookups in related.items():
+        ids = field.related_model._default_manager.filter(**lookups).values_list('pk', flat=True)
+        plain[field.name + '__in'] = list(ids)
+    return plain
+
+
+class _Descending:
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+class IncludingArchive:
+    """A Books query over the hot databases and the archive, see `BooksQuerySet.including_archive()`."""
+
+    def __init__(self, queryset, related=()):
+        self.queryset = queryset
+        self.related = related
+
+    def _clone(self, queryset=None, related=None):
+        return self.__class__(
+            self.queryset if queryset is None else queryset,
+            self.related if related is None else related,
+        )
+
+    def aliases(self):
+        hot = [self.queryset._db] if self.queryset._db else shard_aliases()
+        return hot + ([archive_alias()] if archive_alias() else [])
+
+    def _grouped(self):
+        return self.queryset.query.group_by is not None and self.queryset._iterable_class is not ModelIterable
+
+    def _distinct(self):
+        """Books are unique across the databases, distinct values rows are not."""
+        return self.queryset.query.distinct and self.queryset._iterable_class is not ModelIterable
+
+    def parts(self):
+        query = self.queryset.query
+        if self._grouped():
+            raise NotSupportedError(
+                'including_archive() can not merge grouped values() rows, aggregate() the '
+                'grouping column with Count(distinct=True) or query each database instead.'
+            )
+        if any(isinstance(join, Join) and query.alias_refcount[alias] for alias, join in query.alias_map.items()):
+            raise NotSupportedError(
+                'including_archive() queries can only use Books columns: the shards and the archive '
+                'have no other tables. Filter through author/publisher with keyword lookups after '
+                'including_archive() instead.'
+            )
+        parts = []
+        for alias in self.aliases():
+            part = self.queryset.using(alias)
+            if self.related:
+                part = part.select_related(*self.related) if alias == 'default' else part.prefetch_related(*self.related)
+            parts.append(part)
+        return parts
+
+    def filter(self, *args, **kwargs):
+        return self._clone(self.queryset.filter(*args, **resolve_related_lookups(kwargs)))
+
+    def exclude(self, *args, **kwargs):
+        return self._clone(self.queryset.exclude(*args, **resolve_related_lookups(kwargs)))
+
+    def order_by(self, *fields):
+        return self._clone(self.queryset.order_by(*fields))
+
+    def select_related(self, *fields):
+        fields = fields or tuple(f.name for f in Books._meta.concrete_fields if f.many_to_one)
+        return self._clone(related=self.related + fields)
+
+    def values(self, *fields, **expressions):
+        return self._clone(self.queryset.values(*fields, **expressions))
+
+    def values_list(self, *fields, **kwargs):
+        return self._clone(self.queryset.values_list(*fields, **kwargs))
+
+    def _ordering(self):
+        """[(column, descending)] of the query's order_by(), only plain Books columns."""
+        ordering = []
+        for item in self.queryset.query.order_by:
+            if not isinstance(item, str) or item == '?' or LOOKUP_SEP in item:
+                raise NotSupportedError('including_archive() can only order by Books columns, got %r.' % item)
+            name = item.lstrip('-')
+            field = Books._meta.pk if name == 'pk' else Books._meta.get_field(name)
+            ordering.append((field.attname, item.startswith('-')))
+        return ordering
+
+    def _sortable(self, parts):
+        """
+        (parts, sort key, row cleanup) for merging the ordered parts. values()
+        rows get the ordering columns as extra annotations, removed again by
+        the cleanup.
+        """
+        ordering = self._ordering()
+        iterable = self.queryset._iterable_class
+        if not ordering:
+            return parts, None, None
+        if iterable is ModelIterable:
+            getters = [attrgetter(name) for name, _ in ordering]
+            return parts, self._key(getters, ordering), None
+        if iterable not in (ValuesIterable, ValuesListIterable, FlatValuesListIterable):
+            raise NotSupportedError('including_archive() can not order named values_list() rows.')
+
+        names = ['_archive_order_%d' % i for i in range(len(ordering))]
+        annotations = {alias: F(name) for alias, (name, _) in zip(names, ordering)}
+        annotated = []
+        for part in parts:
+            part = part.annotate(**annotations)
+            part._iterable_class = ValuesIterable if iterable is ValuesIterable else ValuesListIterable
+            annotated.append(part)
+        if iterable is ValuesIterable:
+            getters = [itemgetter(alias) for alias in names]
+            cleanup = lambda row: {k: v for k, v in row.items() if k not in annotations}  # noqa: E731
+        else:
+            extra = len(names)
+            getters = [itemgetter(i - extra) for i in range(extra)]
+            cleanup = itemgetter(0) if iterable is FlatValuesListIterable else (lambda row: row[:-extra])
+        return annotated, self._key(getters, ordering), cleanup
+
+    @staticmethod
+    def _key(getters, ordering):
+        def key(row):
+            values = []
+            for getter, (_, descending) in zip(getters, ordering):
+                value = getter(row)
+                # SQLite sorts NULL first, and last when descending.
+                value = (value is not None, value)
+                values.append(_Descending(value) if descending else value)
+            return tuple(values)
+
+        return key
+
+    def _unique(self, rows):
+        """Drop the values rows an earlier database already returned."""
+        dicts = self.queryset._iterable_class is ValuesIterable
+        seen = set()
+        for row in rows:
+            value = tuple(row.items()) if dicts else row
+            if value not in seen:
+                seen.add(value)
+                yield row
+
+    def _rows(self, stop=None):
+        distinct = self._distinct()
+        parts, key, cleanup = self._sortable(self.parts())
+        # The ordering columns are part of SELECT DISTINCT, so a slice of a
+        # part can hold fewer than `stop` distinct rows.
+        if stop is not None and not distinct:
+            parts = [part[:stop] for part in parts]
+        if key is None:
+            rows = itertools.chain.from_iterable(parts)
+        else:
+            rows = heapq.merge(*parts, key=key)
+            rows = map(cleanup, rows) if cleanup else rows
+        return self._unique(rows) if distinct else rows
+
+    def __iter__(self):
+        return self._rows()
+
+    def __getitem__(self, k):
+        """Rows `k` of the merged result; slices return lists."""
+        if isinstance(k, int):
+            if k < 0:
+                raise ValueError('Negative indexing is not supported.')
+            rows = self[k:k + 1]
+            if not rows:
+                raise IndexError('including_archive() index out of range')
+            return rows[0]
+        if k.step is not None or (k.start or 0) < 0 or (k.stop is not None and k.stop < 0):
+            raise ValueError('Only non negative slices without a step are supported.')
+        return list(itertools.islice(self._rows(k.stop), k.start or 0, k.stop))
+
+    def count(self):
+        if self._distinct():
+            return sum(1 for _ in self._rows())
+        return sum(part.count() for part in self.parts())
+
+    def exists(self):
+        return any(part.exists() for part in self.parts())
+
+    def aggregate(self, *args, **kwargs):
+        if self._distinct():
+            raise NotSupportedError('including_archive() can not merge aggregates over distinct() rows.')
+        return combine([partial_aggregate(part, *args, **kwargs) for part in self.parts()], *args, **kwargs)
@@ -0,0 +1,192 @@
+"""
+Change feed of practice_orm writes.
+
+Signals only see `save()` and `delete()`, not `update()`, `bulk_create()`,
+mass_update, fast_delete or the raw SQL of transfer_books. Here SQLite
+triggers on the practice_orm tables append every insert, update and delete
+to `ChangeEvent` (practice_orm_changeevent) in the same transaction as the
+write itself: a rolled back write leaves no event, a committed one always
+has its event.
+
+    feed = ChangeFeed('search')
+    for batch in feed.batches():
+        for change in batch:
+            reindex(change.table_name, change.row_id, deleted=change.op == 'D')
+        feed.ack(batch)
+
+Events carry the table, the operation ('I', 'U' or 'D') and the row id;
+consumers read the current row themselves. Rows of the followers through
+table also carry their author_id and user_id in `data`.
+
+Delivery is at least once. `ChangeCursor` keeps, per consumer and database,
+the id of the last acknowledged event and only `ack()` moves it, so a
+consumer that crashes mid batch gets the batch again. Within a batch only
+the last event of every row is returned.
+
+Every database has its own outbox, Books shards and the archive included;
+`ChangeFeed(consumer, using=alias)` reads one of them. `compact_changes()`
+(`manage.py compact_changes`) deletes the events every consumer has
+acknowledged and the ones superseded by a later event of the same row.
+
+The triggers are dropped and recreated after every migrate: SQLite drops
+them with the table whenever a migration rebuilds it, and a changed
+`trigger_sql()` has to replace the old definitions.
+"""
+
+from collections import namedtuple
+
+from django.db import connections, router, transaction
+from django.db.models import Min
+
+from practice_orm.models import Author, Books, ChangeCursor, ChangeEvent, Publisher, User
+
+
+OPS = {'I': ('INSERT', 'NEW'), 'U': ('UPDATE', 'NEW'), 'D': ('DELETE', 'OLD')}
+
+Change = namedtuple('Change', 'id table_name op row_id data')
+
+
+TRACKED = [Author, Books, Publisher, User, Author.followers.through]
+
+
+def tracked_models(using):
+    """The tracked models whose tables exist on `using`."""
+    return [model for model in TRACKED if router.allow_migrate_model(using, model)]
+
+
+def trigger_name(model, op):
+    return 'cdc_%s_%s' % (model._meta.db_table, OPS[op][0].lower())
+
+
+def trigger_sql(model, op):
+    event, row = OPS[op]
+    opts = model._meta
+    outbox = ChangeEvent._meta.db_table
+    if opts.auto_created:
+        keys = [f.column for f in opts.concrete_fields if f.is_relation]
+        data = 'json_object(%s)' % ', '.join("'%s', %s.%s" % (key, row, key) for key in keys)
+    else:
+        data = 'NULL'
+    return (
+        'CREATE TRIGGER {name} AFTER {event} ON {table} BEGIN '
+        'INSERT INTO {outbox} (table_name, op, row_id, data, created_at) '
+        "VALUES ('{table}', '{op}', {row}.{pk}, {data}, strftime('%Y-%m-%d %H:%M:%f', 'now')); "
+        'END'
+    ).format(
+        name=trigger_name(model, op), event=event, table=opts.db_table, outbox=outbox,
+        op=op, row=row, pk=opts.pk.column, data=data,
+    )
+
+
+def drop_triggers(using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model in tracked_models(using):
+            for op in OPS:
+                cursor.execute('DROP TRIGGER IF EXISTS %s' % trigger_name(model, op))
+
+
+def install_triggers(using, **kwargs):
+    """post_migrate receiver: (re)create the outbox triggers on `using`."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not router.allow_migrate_model(using, ChangeEvent):
+        return
+    tables = set(connection.introspection.table_names())
+    if ChangeEvent._meta.db_table not in tables:
+        return
+    with transaction.atomic(using=using):
+        drop_triggers(using)
+        with connection.cursor() as cursor:
+            for model in tracked_models(using):
+                if model._meta.db_table in tables:
+                    for op in OPS:
+                        cursor.execute(trigger_sql(model, op))
+
+
+def coalesce(events):
+    """Keep the last event of every row, in outbox order."""
+    last = {}
+    for event in events:
+        key = (event.table_name, event.row_id)
+        last.pop(key, None)
+        last[key] = event
+    return list(last.values())
+
+
+class ChangeFeed:
+    """Batches of outbox events of database `using` after the cursor of `consumer`."""
+
+    def __init__(self, consumer, using='default', batch_size=500):
+        self.consumer = consumer
+        self.using = using
+        self.batch_size = batch_size
+
+    def _cursor(self):
+        return ChangeCursor.objects.get_or_create(consumer=self.consumer, database=self.using)[0]
+
+    def position(self):
+        return self._cursor().position
+
+    def poll(self, after=None):
+        """The next batch of changes after the cursor (or after event id `after`), oldest first."""
+        if after is None:
+            after = self.position()
+        rows = (
+            ChangeEvent.objects.using(self.using)
+            .filter(pk__gt=after).order_by('pk')
+            .values_list('pk', 'table_name', 'op', 'row_id', 'data')[:self.batch_size]
+        )
+        return coalesce(Change(*row) for row in rows)
+
+    def ack(self, batch):
+        """Mark everything up to the batch (or event id) as processed. The cursor never moves back."""
+        position = batch if isinstance(batch, int) else max((change.id for change in batch), default=0)
+        with transaction.atomic():
+            cursor = ChangeCursor.objects.select_for_update().get_or_create(
+                consumer=self.consumer, database=self.using,
+            )[0]
+            if position > cursor.position:
+                cursor.position = position
+                cursor.save(update_fields=['position', 'updated_at'])
+        return cursor.position
+
+    def batches(self):
+        """
+        Yield batches until the outbox is drained. Each batch must be
+        acknowledged before the next one is fetched, otherwise it comes back.
+        """
+        after = self.position()
+        while True:
+            batch = self.poll()
+            if not batch:
+                return
+            if batch[-1].id <= after:
+                raise RuntimeError('Batch of %r was not acknowledged.' % self.consumer)
+            after = batch[-1].id
+            yield batch
+
+    def lag(self):
+        """Events of the outbox the consumer hasn't acknowledged yet."""
+        return ChangeEvent.objects.using(self.using).filter(pk__gt=self.position()).count()
+
+
+def compact_changes(using='default'):
+    """
+    Delete the events of `using` that every consumer has acknowledged and the
+    events superseded by a later one of the same row. Returns the number of
+    events deleted. Event ids are AUTOINCREMENT, so they are never reused.
+    """
+    deleted = 0
+    acked = ChangeCursor.objects.filter(database=using).aggregate(acked=Min('position'))['acked']
+    if acked is not None:
+        deleted += ChangeEvent.objects.using(using).filter(pk__lte=acked).delete()[0]
+
+    table = ChangeEvent._meta.db_table
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {table} WHERE EXISTS ('
+            'SELECT 1 FROM {table} later WHERE later.table_name = {table}.table_name '
+            'AND later.row_id = {table}.row_id AND later.id > {table}.id)'.format(table=table)
+        )
+        deleted += cursor.rowcount
+    return deleted
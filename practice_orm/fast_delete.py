@@ -0,0 +1,187 @@
+"""
+Set based cascading deletes.
+
+`QuerySet.delete()` runs Django's Collector, which loads every cascaded
+object into Python before deleting it. Deleting one prolific author pulls all
+of their books, and `recommendedby` chains pull whole trees of authors or
+publishers into memory.
+
+`fast_delete()` walks the same `on_delete=CASCADE` graph from the model
+metadata but never builds instances. For every batch of root primary keys the
+ids of each cascaded model are collected into a temporary table with
+`INSERT ... SELECT` (a recursive CTE for self referencing foreign keys such as
+`recommendedby`), dependents are deleted first, and nothing but ids ever
+leaves the database.
+
+    deleted, per_model = fast_delete(Author.objects.filter(pk=1))
+    # (1204, {'practice_orm.Books': 1100, 'practice_orm.Author_followers': 3, 'practice_orm.Author': 101})
+
+The return value has the same shape as `QuerySet.delete()`. When the fast
+path can't give the same result - delete signal receivers are connected, a
+relation uses something other than CASCADE or DO_NOTHING, or the database is
+not SQLite - the queryset's own `delete()` is used instead.
+
+Two receivers are stood in for. sharding.cascade_remote_books: after every
+batch commits, the books of the deleted authors and publishers are deleted
+on the other shards and the archive, and counted with the rest.
+sketches.record_deleted: the values of the sketched columns are counted per
+value before the rows go and recorded as sketch deltas.
+"""
+
+import itertools
+from collections import Counter, defaultdict
+
+from django.db import connections, models, transaction
+from django.db.models import signals
+
+from practice_orm import sharding, sketches
+
+# Delete receivers whose work fast_delete() does itself.
+HANDLED_RECEIVERS = (sharding.cascade_remote_books, sketches.record_deleted)
+
+
+def _self_fks(model):
+    return [
+        f for f in model._meta.concrete_fields
+        if f.many_to_one and f.related_model is model and f.remote_field.on_delete is models.CASCADE
+    ]
+
+
+def _dependents(model):
+    """Reverse foreign keys (including auto created m2m through tables) that cascade from `model`."""
+    return [
+        rel for rel in model._meta.get_fields(include_hidden=True)
+        if (rel.one_to_many or rel.one_to_one) and rel.auto_created and not rel.concrete
+        and rel.related_model is not model and rel.on_delete is models.CASCADE
+    ]
+
+
+def _has_listeners(signal, model):
+    sync_receivers, async_receivers = signal._live_receivers(model)
+    return any(receiver not in HANDLED_RECEIVERS for receiver in sync_receivers + async_receivers)
+
+
+def can_fast_delete(model, connection, _seen=()):
+    if connection.vendor != 'sqlite':
+        return False
+    if model in _seen or model._meta.private_fields:
+        return False
+    if _has_listeners(signals.pre_delete, model) or _has_listeners(signals.post_delete, model):
+        return False
+    for rel in model._meta.get_fields(include_hidden=True):
+        if not ((rel.one_to_many or rel.one_to_one) and rel.auto_created and not rel.concrete):
+            continue
+        if rel.on_delete is models.DO_NOTHING:
+            continue
+        if rel.on_delete is not models.CASCADE:
+            return False
+    return all(
+        can_fast_delete(rel.related_model, connection, _seen + (model,))
+        for rel in _dependents(model)
+    )
+
+
+class _Batch:
+    def __init__(self, cursor, connection, counts):
+        self.cursor = cursor
+        self.qn = connection.ops.quote_name
+        self.counts = counts
+        self.names = ('fast_delete_%d' % i for i in itertools.count())
+        # Deleted Author/Publisher ids whose books on the remote aliases go after commit.
+        self.remote = defaultdict(list)
+        self.sketch_deltas = []
+
+    def _uncount(self, model, ids_sql, params):
+        qn = self.qn
+        opts = model._meta
+        for name, column in sketches.tracked_columns(model):
+            self.cursor.execute(
+                'SELECT %s, COUNT(*) FROM %s WHERE %s IN (%s) GROUP BY %s'
+                % (qn(column), qn(opts.db_table), qn(opts.pk.column), ids_sql, qn(column)),
+                params,
+            )
+            self.sketch_deltas.extend((name, value, -count) for value, count in self.cursor.fetchall())
+
+    def delete(self, model, ids_sql, params):
+        """Delete the rows of `model` whose pk is returned by `ids_sql`, dependents first."""
+        qn = self.qn
+        opts = model._meta
+        table, pk = qn(opts.db_table), qn(opts.pk.column)
+        self_fks = _self_fks(model)
+        dependents = _dependents(model)
+
+        if not self_fks and not dependents:
+            self._uncount(model, ids_sql, params)
+            self.cursor.execute('DELETE FROM %s WHERE %s IN (%s)' % (table, pk, ids_sql), params)
+            self.counts[opts.label] += self.cursor.rowcount
+            return
+
+        temp = next(self.names)
+        self.cursor.execute('CREATE TEMP TABLE %s (id INTEGER PRIMARY KEY)' % temp)
+        if self_fks:
+            joins = ' OR '.join('c.%s = closure.id' % qn(f.column) for f in self_fks)
+            self.cursor.execute(
+                'WITH RECURSIVE closure(id) AS ('
+                'SELECT %(pk)s FROM %(table)s WHERE %(pk)s IN (%(ids)s) '
+                'UNION SELECT c.%(pk)s FROM %(table)s c JOIN closure ON %(joins)s'
+                ') INSERT INTO %(temp)s SELECT id FROM closure'
+                % {'pk': pk, 'table': table, 'ids': ids_sql, 'joins': joins, 'temp': temp},
+                params,
+            )
+        else:
+            self.cursor.execute('INSERT INTO %s %s' % (temp, ids_sql), params)
+
+        for rel in dependents:
+            related = rel.related_model._meta
+            self.delete(
+                rel.related_model,
+                'SELECT %s FROM %s WHERE %s IN (SELECT id FROM %s)' % (
+                    qn(related.pk.column), qn(related.db_table), qn(rel.field.column), temp,
+                ),
+                (),
+            )
+
+        self._uncount(model, 'SELECT id FROM %s' % temp, ())
+        if sharding.books_fk(model) and sharding.remote_aliases():
+            self.cursor.execute('SELECT id FROM %s' % temp)
+            self.remote[model].extend(row[0] for row in self.cursor.fetchall())
+
+        self.cursor.execute('DELETE FROM %s WHERE %s IN (SELECT id FROM %s)' % (table, pk, temp))
+        self.counts[opts.label] += self.cursor.rowcount
+        self.cursor.execute('DROP TABLE %s' % temp)
+
+
+def fast_delete(queryset, batch_size=500):
+    """
+    Delete `queryset` and everything that cascades from it, `batch_size` root
+    rows per transaction. Returns (total, {model label: count}).
+    """
+    model = queryset.model
+    using = queryset.db
+    connection = connections[using]
+    if not can_fast_delete(model, connection):
+        return queryset.delete()
+
+    counts = Counter()
+    queryset = queryset.order_by()
+    remaining = queryset
+    while True:
+        pks = list(remaining.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            ids_sql = 'SELECT %s FROM %s WHERE %s IN (%s)' % (
+                connection.ops.quote_name(model._meta.pk.column),
+                connection.ops.quote_name(model._meta.db_table),
+                connection.ops.quote_name(model._meta.pk.column),
+                ', '.join(['%s'] * len(pks)),
+            )
+            batch = _Batch(cursor, connection, counts)
+            batch.delete(model, ids_sql, pks)
+        sketches.record_deltas(batch.sketch_deltas)
+        for deleted_model, ids in batch.remote.items():
+            books = sharding.delete_remote_books(deleted_model, ids)
+            if books:
+                counts['practice_orm.Books'] += books
+        remaining = queryset.filter(pk__gt=pks[-1])
+    return sum(counts.values()), dict(counts)
@@ -0,0 +1,187 @@
+"""
+Request scoped, batching loaders for the practice_orm models.
+
+Resolving `book.author`, `book.publisher` or `author.recommendedby` one object
+at a time costs one query per object. A loader collects every key asked for
+during one "tick", fetches them with a single `pk__in` query and keeps the
+result for the rest of the request.
+
+    loaders = Loaders()
+
+    # sync: queue everything first, the first .get() runs one query
+    pending = [loaders.author.load(book.author_id) for book in books]
+    authors = [p.get() for p in pending]
+
+    # or in one call
+    authors = loaders.author.load_many([book.author_id for book in books])
+
+    # asyncio: every aload() issued in the same event loop tick is batched
+    authors = await asyncio.gather(*(loaders.author.aload(b.author_id) for b in books))
+
+Keys that do not exist resolve to None. `loaders.books` asks every Books
+shard (see sharding.py) for the keys still missing, archived books are not
+loaded. `LoaderMiddleware` attaches a fresh `Loaders` instance to every
+request as `request.loaders`.
+"""
+
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from practice_orm.models import Author, Books, Publisher, User
+from practice_orm.sharding import shard_aliases
+
+
+class Pending:
+    """Value of a `DataLoader.load()` call, fetched on first `get()`."""
+
+    def __init__(self, loader, key):
+        self.loader = loader
+        self.key = key
+
+    def get(self):
+        if self.key not in self.loader._cache:
+            self.loader.dispatch()
+        return self.loader._cache[self.key]
+
+
+class DataLoader:
+    """Coalesces, dedupes and caches primary key lookups of one model."""
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+        self._cache = {}
+        self._queue = {}
+        self._waiters = {}
+        self._scheduled = False
+
+    def _enqueue(self, key):
+        if key not in self._cache:
+            self._queue[key] = None
+
+    def load(self, key):
+        self._enqueue(key)
+        return Pending(self, key)
+
+    def load_many(self, keys):
+        keys = list(keys)
+        for key in keys:
+            self._enqueue(key)
+        if self._queue:
+            self.dispatch()
+        return [self._cache[key] for key in keys]
+
+    def dispatch(self):
+        keys, self._queue = list(self._queue), {}
+        if keys:
+            self._store(keys, self.fetch(keys))
+
+    def fetch(self, keys):
+        return self.queryset.in_bulk(keys)
+
+    async def afetch(self, keys):
+        return await self.queryset.ain_bulk(keys)
+
+    def _store(self, keys, found):
+        for key in keys:
+            self._cache[key] = found.get(key)
+            future = self._waiters.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(self._cache[key])
+
+    async def aload(self, key):
+        if key in self._cache:
+            return self._cache[key]
+        if key not in self._waiters:
+            self._waiters[key] = asyncio.get_running_loop().create_future()
+            self._enqueue(key)
+        if not self._scheduled:
+            self._scheduled = True
+            # call_soon runs after every coroutine already scheduled in this
+            # tick had its chance to queue keys.
+            asyncio.get_running_loop().call_soon(self._start_dispatch)
+        return await asyncio.shield(self._waiters[key])
+
+    async def aload_many(self, keys):
+        return await asyncio.gather(*(self.aload(key) for key in keys))
+
+    def _start_dispatch(self):
+        self._dispatching = asyncio.ensure_future(self._adispatch())
+
+    async def _adispatch(self):
+        self._scheduled = False
+        keys, self._queue = list(self._queue), {}
+        if not keys:
+            return
+        try:
+            found = await self.afetch(keys)
+        except Exception as exc:
+            for key in keys:
+                future = self._waiters.pop(key, None)
+                if future is not None and not future.done():
+                    future.set_exception(exc)
+            return
+        self._store(keys, found)
+
+    def prime(self, key, value):
+        self._cache.setdefault(key, value)
+
+    def clear(self, key=None):
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+
+class ShardedDataLoader(DataLoader):
+    """DataLoader for Books: tries the shards in order with the keys not found yet."""
+
+    def fetch(self, keys):
+        found = {}
+        for alias in shard_aliases():
+            missing = [key for key in keys if key not in found]
+            if not missing:
+                break
+            found.update(self.queryset.using(alias).in_bulk(missing))
+        return found
+
+    async def afetch(self, keys):
+        found = {}
+        for alias in shard_aliases():
+            missing = [key for key in keys if key not in found]
+            if not missing:
+                break
+            found.update(await self.queryset.using(alias).ain_bulk(missing))
+        return found
+
+
+class Loaders:
+    """One `DataLoader` per practice_orm model, meant to live for one request."""
+
+    def __init__(self):
+        self.author = DataLoader(Author.objects.all())
+        self.books = ShardedDataLoader(Books.objects.all())
+        self.publisher = DataLoader(Publisher.objects.all())
+        self.user = DataLoader(User.objects.all())
+
+
+class LoaderMiddleware:
+    """Gives every request its own `request.loaders`."""
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.loaders = Loaders()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.loaders = Loaders()
+        return await self.get_response(request)
@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from practice_orm.archive import archive_books
+
+
+class Command(BaseCommand):
+    help = 'Move Books published before a cutoff date to the archive database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=datetime.date.fromisoformat, required=True, help='cutoff date, YYYY-MM-DD')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            moved = archive_books(options['before'], chunk_size=options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(e)
+        for alias, count in moved.items():
+            self.stdout.write('%s: %d books archived' % (alias, count))
+        self.stdout.write(self.style.SUCCESS('Archived %d books.' % sum(moved.values())))
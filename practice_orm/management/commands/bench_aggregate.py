@@ -0,0 +1,80 @@
+import math
+import random
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max, Min
+
+from practice_orm.models import Author, Books, Publisher
+from practice_orm.parallel import parallel_aggregate
+from practice_orm.seed import make_books, seed
+from practice_orm.sharding import holds_only_books
+
+
+class Command(BaseCommand):
+    help = 'Benchmark parallel_aggregate() against a single query on a large seeded Books table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1000000, help='seed Books up to this many rows')
+        parser.add_argument('--workers', default='1,2,4,8', help='comma separated worker counts')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument(
+            '--database', default='bench',
+            help='scratch database to migrate, seed and benchmark, never one holding real data',
+        )
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if using == 'default' or holds_only_books(using):
+            raise CommandError(
+                '%r holds real data and bench_aggregate adds up to --books rows to it. '
+                'Use a scratch database such as "bench".' % using
+            )
+        call_command('migrate', database=using, verbosity=0)
+        self.top_up(using, options['books'])
+        queryset = Books.objects.using(using).all()
+        aggregates = {
+            'avg_price': Avg('price'),
+            'min_date': Min('published_date'),
+            'max_price': Max('price'),
+            'authors': Count('author', distinct=True),
+        }
+
+        start = time.perf_counter()
+        expected = queryset.aggregate(**aggregates)
+        baseline = time.perf_counter() - start
+        self.stdout.write('%d books, single query: %.3fs' % (queryset.count(), baseline))
+
+        for workers in [int(w) for w in options['workers'].split(',')]:
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                result = parallel_aggregate(queryset, workers=workers, **aggregates)
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            self.stdout.write('workers=%-3d best %.3fs  speedup x%.2f  %s' % (
+                workers, best, baseline / best, 'ok' if self.matches(result, expected) else 'MISMATCH %s' % result,
+            ))
+
+    def matches(self, result, expected):
+        return all(
+            math.isclose(result[k], v) if isinstance(v, float) else result[k] == v
+            for k, v in expected.items()
+        )
+
+    def top_up(self, using, books):
+        missing = books - Books.objects.using(using).count()
+        if missing <= 0:
+            return
+        if not Author.objects.using(using).exists():
+            seed(authors=1000, publishers=100, books=0, users=0, using=using)
+        authors = list(Author.objects.using(using).all())
+        publishers = list(Publisher.objects.using(using).all())
+        rng = random.Random(missing)
+        self.stdout.write('Seeding %d books...' % missing)
+        for start in range(0, missing, 10000):
+            Books.objects.using(using).bulk_create(
+                make_books(rng, range(start, min(start + 10000, missing)), authors, publishers),
+                batch_size=2000,
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from practice_orm.cdc import ChangeFeed, compact_changes
+from practice_orm.models import ChangeCursor
+from practice_orm.sharding import archive_alias, shard_aliases
+
+
+class Command(BaseCommand):
+    help = 'Drop acknowledged and superseded events from the change outboxes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', help='outbox to compact, every database by default')
+
+    def handle(self, *args, **options):
+        aliases = options['database'] or shard_aliases() + [alias for alias in [archive_alias()] if alias]
+        for alias in aliases:
+            deleted = compact_changes(alias)
+            self.stdout.write('%s: %d events deleted' % (alias, deleted))
+            for consumer in ChangeCursor.objects.filter(database=alias).values_list('consumer', flat=True):
+                self.stdout.write('  %s lags %d events' % (consumer, ChangeFeed(consumer, using=alias).lag()))
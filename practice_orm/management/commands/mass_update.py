@@ -0,0 +1,76 @@
+import operator
+import re
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Value
+
+from practice_orm.mass_update import mass_update
+
+
+OPERATORS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+ASSIGNMENT = re.compile(r'^(\w+)=(.+)$')
+EXPRESSION = re.compile(r'^(\w+)\s*([-+*/])\s*(-?\d+(?:\.\d+)?)$')
+NUMBER = re.compile(r'^-?\d+(?:\.\d+)?$')
+
+
+def parse_number(text):
+    return float(text) if '.' in text else int(text)
+
+
+def parse_assignment(text):
+    """
+    Turn `popularity_score=popularity_score+1` into
+    ('popularity_score', F('popularity_score') + Value(1)).
+    """
+    match = ASSIGNMENT.match(text.replace(' ', ''))
+    if not match:
+        raise CommandError('Expected field=expression, got %r.' % text)
+    field, expression = match.groups()
+    if NUMBER.match(expression):
+        return field, Value(parse_number(expression))
+    match = EXPRESSION.match(expression)
+    if match:
+        other, op, number = match.groups()
+        return field, OPERATORS[op](F(other), Value(parse_number(number)))
+    if expression.isidentifier():
+        return field, F(expression)
+    raise CommandError('Unsupported expression %r.' % expression)
+
+
+class Command(BaseCommand):
+    help = 'Apply an F() expression update to a practice_orm model in short, resumable pk-range chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='practice_orm model name, e.g. Author')
+        parser.add_argument('assignments', nargs='+', help='field=expression, e.g. popularity_score=popularity_score+1')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0, help='seconds to wait between chunks')
+        parser.add_argument('--checkpoint', help='name under which an interrupted run is resumed')
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model('practice_orm', options['model'])
+        except LookupError as e:
+            raise CommandError(e)
+        updates = dict(parse_assignment(a) for a in options['assignments'])
+
+        def progress(done, total, last_pk):
+            self.stdout.write('%d/%d rows updated (last pk %s)' % (done, total, last_pk))
+
+        updated = mass_update(
+            model.objects.using(options['database']),
+            chunk_size=options['chunk_size'],
+            sleep=options['sleep'],
+            checkpoint=options['checkpoint'],
+            progress=progress if options['verbosity'] else None,
+            **updates,
+        )
+        self.stdout.write(self.style.SUCCESS('Updated %d %s rows.' % (updated, model.__name__)))
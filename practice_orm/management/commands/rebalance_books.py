@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from practice_orm.models import Books
+from practice_orm.sharding import shard_aliases, shard_for, transfer_books
+
+
+class Command(BaseCommand):
+    help = 'Move Books rows to the shard their publisher maps to under the current BOOKS_SHARDS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--source', action='append', default=[],
+            help='extra alias to drain, e.g. a BOOKS_SHARD_ALIASES shard removed from BOOKS_SHARDS (repeatable)',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        moved = 0
+        for source in shard_aliases() + options['source']:
+            if source not in connections:
+                raise CommandError('Unknown database alias %r.' % source)
+            publishers = list(
+                Books.objects.using(source).order_by()
+                .values_list('publisher_id', flat=True).distinct()
+            )
+            for publisher_id in publishers:
+                target = shard_for(publisher_id)
+                if target == source:
+                    continue
+                count = Books.objects.using(source).filter(publisher_id=publisher_id).count()
+                self.stdout.write('publisher %s: %d books %s -> %s' % (publisher_id, count, source, target))
+                if not options['dry_run']:
+                    moved += self.move(source, target, publisher_id, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS('Moved %d books.' % moved))
+
+    def move(self, source, target, publisher_id, chunk_size):
+        try:
+            # Ids are unique across shards, a moved book keeps its id.
+            return transfer_books(source, target, 'publisher_id = %s', [publisher_id], chunk_size, keep_pk=True)
+        except ValueError as e:
+            raise CommandError(e)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from practice_orm import sketches
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the distinct count and top-k sketches from the tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='tracked columns to rebuild, all by default')
+        parser.add_argument(
+            '--flush', action='store_true',
+            help='only merge the pending deltas into the stored sketches instead of rescanning the tables',
+        )
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(sketches.TRACKED)
+        for name in names:
+            if name not in sketches.TRACKED:
+                raise CommandError('Unknown sketch %r, expected one of %s.' % (name, ', '.join(sketches.TRACKED)))
+        if options['flush']:
+            for name in names:
+                self.stdout.write('%s: %d deltas merged' % (name, sketches.flush(name)))
+            return
+        for name in names:
+            sketch = sketches.rebuild(name)
+            self.stdout.write('%s: ~%d distinct values, top %s' % (
+                name, sketch.hll.count(), ', '.join(str(value) for value, _ in sketch.top.top(3)),
+            ))
@@ -0,0 +1,20 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from practice_orm.temporal import DATE_FIELDS, refresh_monthly_counts
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-month row counts of Author, Publisher and Books'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=datetime.date.fromisoformat,
+            help='only regroup months from this date (YYYY-MM-DD) on, everything by default',
+        )
+
+    def handle(self, *args, **options):
+        for model in DATE_FIELDS:
+            counts = refresh_monthly_counts(model, since=options['since'])
+            self.stdout.write('%s: %d rows in %d months' % (model.__name__, sum(counts.values()), len(counts)))
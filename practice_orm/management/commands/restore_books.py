@@ -0,0 +1,23 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from practice_orm.archive import restore_books
+
+
+class Command(BaseCommand):
+    help = 'Move archived Books back to the hot databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=datetime.date.fromisoformat, help='restore books published on or after YYYY-MM-DD')
+        parser.add_argument('--ids', type=int, nargs='+', help='restore these books')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['since'] is None and options['ids'] is None:
+            raise CommandError('Pass --since or --ids.')
+        try:
+            restored = restore_books(options['since'], options['ids'], chunk_size=options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(e)
+        self.stdout.write(self.style.SUCCESS('Restored %d books.' % restored))
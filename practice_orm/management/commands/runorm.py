@@ -1,10 +1,73 @@
 # practice_orm/management/commands/run_orm_practice.py
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
 from django.core.management.base import BaseCommand
-from practice_orm.practice_orm import practice_orm
+
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def parse_importtime(stderr):
+    """[(self us, cumulative us, depth, module)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append((int(own), int(cumulative), (len(indent) - 1) // 2, module))
+    return rows
 
 
 class Command(BaseCommand):
     help = 'Run ORM practice commands'
 
-    def handle(self, *args, **kwargs):
-        practice_orm()
\ No newline at end of file
+    # Cron runs this every minute, skip the system checks of every installed app.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--importtime', action='store_true',
+            help='run the command in a fresh interpreter under -X importtime and report where startup goes',
+        )
+        parser.add_argument('--top', type=int, default=15, help='packages to list with --importtime')
+
+    def handle(self, *args, **options):
+        if options['importtime']:
+            return self.report_importtime(options['top'])
+
+        from practice_orm.practice_orm import practice_orm
+
+        practice_orm()
+
+    def report_importtime(self, top):
+        manage = os.path.abspath(sys.argv[0])
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', manage, 'runorm'],
+            capture_output=True, text=True,
+        )
+        wall = time.perf_counter() - start
+        if result.returncode:
+            self.stderr.write(result.stderr)
+            return
+
+        rows = parse_importtime(result.stderr)
+        packages = defaultdict(int)
+        for own, _, _, module in rows:
+            packages[module.split('.')[0]] += own
+        total = sum(own for own, _, _, _ in rows)
+
+        self.stdout.write('settings: %s' % os.environ['DJANGO_SETTINGS_MODULE'])
+        self.stdout.write('cold start: %.0f ms wall, %.0f ms importing %d modules' % (wall * 1000, total / 1000, len(rows)))
+        self.stdout.write('%10s  %6s  %s' % ('self ms', 'share', 'package'))
+        for package, own in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write('%10.1f  %5.1f%%  %s' % (own / 1000, 100.0 * own / total, package))
+        self.stdout.write('%10s  %6s  %s' % ('cumul ms', '', 'slowest top level imports'))
+        top_level = sorted((row for row in rows if row[2] == 0), key=lambda row: -row[1])[:top]
+        for _, cumulative, _, module in top_level:
+            self.stdout.write('%10.1f  %6s  %s' % (cumulative / 1000, '', module))
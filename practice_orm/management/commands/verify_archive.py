@@ -0,0 +1,27 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from practice_orm.archive import verify_archive
+
+
+class Command(BaseCommand):
+    help = 'Check the archive database against the hot Books databases'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', type=datetime.date.fromisoformat,
+            help='archive cutoff, also check that no book is on the wrong side of it',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = verify_archive(options['before'])
+        except ValueError as e:
+            raise CommandError(e)
+        for key, value in report.items():
+            self.stdout.write('%s: %d' % (key, value))
+        problems = {key: value for key, value in report.items() if key != 'archived' and value}
+        if problems:
+            raise CommandError('Archive is inconsistent: %s' % ', '.join('%s=%d' % item for item in problems.items()))
+        self.stdout.write(self.style.SUCCESS('Archive OK.'))
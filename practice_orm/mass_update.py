@@ -0,0 +1,85 @@
+"""
+Chunked mass updates.
+
+`Author.objects.update(popularity_score=F('popularity_score') + 1)` is a single
+UPDATE over the whole table, and on SQLite it holds the write lock until the
+last row is written. `mass_update()` applies the same F()/Case expressions in
+primary key ranges, one short transaction per chunk, so readers get the
+database between chunks.
+
+    mass_update(
+        Author.objects.all(),
+        chunk_size=1000,
+        sleep=0.05,
+        checkpoint='author_popularity',
+        popularity_score=F('popularity_score') + 1,
+    )
+
+With `checkpoint` set, the last updated pk is saved in a
+`MassUpdateCheckpoint` row, in the same transaction as the chunk's UPDATE,
+so a crash never leaves a committed chunk without its checkpoint (and
+`F('x') + 1` is never applied twice). The row is keyed by the checkpoint
+name, the model, the queryset's SQL and the updates: running the same call
+again resumes after the last chunk, a different call starts over. The row
+is deleted once the whole queryset has been processed.
+"""
+
+import hashlib
+import time
+
+from django.core.exceptions import EmptyResultSet
+from django.db import transaction
+
+from practice_orm.models import MassUpdateCheckpoint
+
+
+def checkpoint_key(name, queryset, updates):
+    digest = hashlib.sha1(queryset.model._meta.label.encode())
+    try:
+        digest.update(repr(queryset.query.sql_with_params()).encode())
+    except EmptyResultSet:
+        # filter(pk__in=[]) and the like compile to no SQL at all.
+        digest.update(b'EmptyResultSet')
+    for field, value in sorted(updates.items()):
+        digest.update(('%s=%r' % (field, value)).encode())
+    return '%s:%s' % (name, digest.hexdigest()[:16])
+
+
+def mass_update(queryset, chunk_size=1000, sleep=0, checkpoint=None, progress=None, **updates):
+    """
+    Apply `queryset.update(**updates)` in pk ordered chunks of `chunk_size`
+    rows and return the number of rows updated.
+
+    `progress(done, total, last_pk)` is called after every committed chunk.
+    `sleep` seconds are waited between chunks to let readers in.
+    """
+    if not updates:
+        raise ValueError('mass_update() needs at least one field to update.')
+
+    queryset = queryset.order_by()
+    db = queryset.db
+    checkpoints = MassUpdateCheckpoint.objects.using(db)
+    key = checkpoint_key(checkpoint, queryset, updates) if checkpoint else None
+    last_pk = checkpoints.filter(key=key).values_list('last_pk', flat=True).first() if key else None
+    remaining = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+    total = remaining.count()
+    done = 0
+
+    while True:
+        pks = list(remaining.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+        with transaction.atomic(using=db):
+            done += remaining.filter(pk__lte=last_pk).update(**updates)
+            if key:
+                checkpoints.update_or_create(key=key, defaults={'last_pk': last_pk})
+        if progress:
+            progress(done, total, last_pk)
+        remaining = queryset.filter(pk__gt=last_pk)
+        if sleep and len(pks) == chunk_size:
+            time.sleep(sleep)
+
+    if key:
+        checkpoints.filter(key=key).delete()
+    return done
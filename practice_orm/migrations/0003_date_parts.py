@@ -0,0 +1,112 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:35
+
+import django.db.models.functions.comparison
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice_orm', '0002_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100)),
+                ('month', models.DateField()),
+                ('count', models.IntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='joindate_day',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('joindate', 9, 2), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='joindate_month',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('joindate', 6, 2), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='author',
+            name='joindate_year',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('joindate', 1, 4), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='books',
+            name='published_date_day',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('published_date', 9, 2), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='books',
+            name='published_date_month',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('published_date', 6, 2), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='books',
+            name='published_date_year',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('published_date', 1, 4), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='joindate_day',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('joindate', 9, 2), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='joindate_month',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('joindate', 6, 2), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AddField(
+            model_name='publisher',
+            name='joindate_year',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.comparison.Cast(django.db.models.functions.text.Substr('joindate', 1, 4), models.IntegerField()), output_field=models.IntegerField()),
+        ),
+        migrations.AlterField(
+            model_name='author',
+            name='joindate',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='books',
+            name='published_date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='publisher',
+            name='joindate',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['joindate_year', 'joindate_month'], name='author_joindate_ym_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['joindate_day'], name='author_joindate_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(fields=['published_date_year', 'published_date_month'], name='books_published_ym_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(fields=['published_date_day'], name='books_published_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['joindate_year', 'joindate_month'], name='publisher_joindate_ym_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['joindate_day'], name='publisher_joindate_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlycount',
+            constraint=models.UniqueConstraint(fields=('model', 'month'), name='monthlycount_model_month_unique'),
+        ),
+    ]
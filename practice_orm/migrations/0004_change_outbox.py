@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice_orm', '0003_date_parts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=100)),
+                ('database', models.CharField(default='default', max_length=100)),
+                ('position', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table_name', models.CharField(max_length=100)),
+                ('op', models.CharField(max_length=1)),
+                ('row_id', models.BigIntegerField()),
+                ('data', models.JSONField(null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='changecursor',
+            constraint=models.UniqueConstraint(fields=('consumer', 'database'), name='changecursor_consumer_database_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='changeevent',
+            index=models.Index(fields=['table_name', 'row_id'], name='changeevent_row_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice_orm', '0005_mass_update_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SketchDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('value', models.CharField(max_length=200)),
+                ('count', models.IntegerField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'value'], name='sketchdelta_name_value_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('practice_orm', '0006_sketch_delta'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['joindate_month'], name='author_joindate_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='books',
+            index=models.Index(fields=['published_date_month'], name='books_published_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['joindate_month'], name='publisher_joindate_month_idx'),
+        ),
+    ]
@@ -1,9 +1,55 @@
-from django.db import models
+from django.db import models, router
+from django.db.models.functions import Cast, Substr
 
 # Create your models here.
 from django.db import models
 
 
+def date_part(field, part):
+    """
+    Stored generated column holding the year, month or day of a DateField.
+    SQLite stores dates as 'YYYY-MM-DD' text, so the part is cut out with
+    plain SUBSTR/CAST instead of Django's Extract, which is a Python function
+    on SQLite and can't be used in a generated column.
+    """
+    start, length = {'year': (1, 4), 'month': (6, 2), 'day': (9, 2)}[part]
+    return models.GeneratedField(
+        expression=Cast(Substr(field, start, length), models.IntegerField()),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
+
+
+class BooksQuerySet(models.QuerySet):
+    """
+    Routes new books to the database of their publisher's shard (see
+    sharding.py). Archived books are only included on request.
+    """
+
+    def create(self, **kwargs):
+        if self._db is None:
+            alias = router.db_for_write(self.model, instance=self.model(**kwargs))
+            return self.using(alias).create(**kwargs)
+        return super().create(**kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        if self._db is not None:
+            return super().bulk_create(objs, *args, **kwargs)
+        objs = list(objs)
+        shards = {}
+        for obj in objs:
+            shards.setdefault(router.db_for_write(self.model, instance=obj), []).append(obj)
+        for alias, shard_objs in shards.items():
+            self.using(alias).bulk_create(shard_objs, *args, **kwargs)
+        return objs
+
+    def including_archive(self):
+        """The same query over hot and archived books (see archive.py)."""
+        from practice_orm.archive import IncludingArchive
+
+        return IncludingArchive(self)
+
+
 class Author(models.Model):
     firstname = models.CharField(max_length=100)
     lastname = models.CharField(max_length=100)
@@ -11,9 +57,19 @@ class Author(models.Model):
     zipcode = models.IntegerField(null=True)
     telephone = models.CharField(max_length=100, null=True)
     recommendedby = models.ForeignKey('Author', on_delete=models.CASCADE, related_name='recommended_authors', related_query_name='recommended_authors', null=True)
-    joindate = models.DateField()
+    joindate = models.DateField(db_index=True)
     popularity_score = models.IntegerField()
     followers = models.ManyToManyField('User', related_name='followed_authors', related_query_name='followed_authors')
+    joindate_year = date_part('joindate', 'year')
+    joindate_month = date_part('joindate', 'month')
+    joindate_day = date_part('joindate', 'day')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['joindate_year', 'joindate_month'], name='author_joindate_ym_idx'),
+            models.Index(fields=['joindate_month'], name='author_joindate_month_idx'),
+            models.Index(fields=['joindate_day'], name='author_joindate_day_idx'),
+        ]
     
     def __str__(self):
         return self.firstname + ' ' + self.lastname
@@ -23,9 +79,22 @@ class Books(models.Model):
     title = models.CharField(max_length=100)
     genre = models.CharField(max_length=200)
     price = models.IntegerField(null=True)
-    published_date = models.DateField()
+    published_date = models.DateField(db_index=True)
     author = models.ForeignKey('Author', on_delete=models.CASCADE, related_name='books', related_query_name='books')
     publisher = models.ForeignKey('Publisher', on_delete=models.CASCADE, related_name='books', related_query_name='books')
+    published_date_year = date_part('published_date', 'year')
+    published_date_month = date_part('published_date', 'month')
+    published_date_day = date_part('published_date', 'day')
+
+    objects = BooksQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['published_date_year', 'published_date_month'], name='books_published_ym_idx'),
+            models.Index(fields=['published_date_month'], name='books_published_month_idx'),
+            models.Index(fields=['published_date_day'], name='books_published_day_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -34,8 +103,18 @@ class Publisher(models.Model):
     firstname = models.CharField(max_length=100)
     lastname = models.CharField(max_length=100)
     recommendedby = models.ForeignKey('Publisher', on_delete=models.CASCADE, null=True)
-    joindate = models.DateField()
+    joindate = models.DateField(db_index=True)
     popularity_score = models.IntegerField()
+    joindate_year = date_part('joindate', 'year')
+    joindate_month = date_part('joindate', 'month')
+    joindate_day = date_part('joindate', 'day')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['joindate_year', 'joindate_month'], name='publisher_joindate_ym_idx'),
+            models.Index(fields=['joindate_month'], name='publisher_joindate_month_idx'),
+            models.Index(fields=['joindate_day'], name='publisher_joindate_day_idx'),
+        ]
     
     def __str__(self):
         return self.firstname + ' ' + self.lastname
@@ -46,4 +125,87 @@ class User(models.Model):
     email = models.CharField(max_length=100)
     
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+
+class Sketch(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SketchDelta(models.Model):
+    """Change to a Sketch not merged into its data yet (see practice_orm/sketches.py)."""
+
+    name = models.CharField(max_length=100)
+    value = models.CharField(max_length=200)
+    count = models.IntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name', 'value'], name='sketchdelta_name_value_idx'),
+        ]
+
+    def __str__(self):
+        return '%s %s %+d' % (self.name, self.value, self.count)
+
+
+class MonthlyCount(models.Model):
+    model = models.CharField(max_length=100)
+    month = models.DateField()
+    count = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'month'], name='monthlycount_model_month_unique'),
+        ]
+
+    def __str__(self):
+        return '%s %s: %d' % (self.model, self.month.strftime('%Y-%m'), self.count)
+
+
+class ChangeEvent(models.Model):
+    """Outbox row written by the SQLite triggers of practice_orm/cdc.py."""
+
+    table_name = models.CharField(max_length=100)
+    op = models.CharField(max_length=1)
+    row_id = models.BigIntegerField()
+    data = models.JSONField(null=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['table_name', 'row_id'], name='changeevent_row_idx'),
+        ]
+
+    def __str__(self):
+        return '%s %s %s' % (self.op, self.table_name, self.row_id)
+
+
+class ChangeCursor(models.Model):
+    consumer = models.CharField(max_length=100)
+    database = models.CharField(max_length=100, default='default')
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['consumer', 'database'], name='changecursor_consumer_database_unique'),
+        ]
+
+    def __str__(self):
+        return '%s@%s: %d' % (self.consumer, self.database, self.position)
+
+
+class MassUpdateCheckpoint(models.Model):
+    """Last pk updated by a resumable practice_orm.mass_update run."""
+
+    key = models.CharField(max_length=200, unique=True)
+    last_pk = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s: %d' % (self.key, self.last_pk)
@@ -0,0 +1,78 @@
+"""
+Full table aggregates split over a process pool.
+
+    parallel_aggregate(Books.objects.all(), Avg('price'), workers=4)
+    parallel_aggregate(
+        Books.objects.filter(genre='Fantasy'),
+        total=Sum('price'), titles=Count('title', distinct=True), workers=8,
+    )
+
+The queryset's pk range is cut into `workers * chunks_per_worker` slices,
+every slice is aggregated on its own database connection in a worker process
+and the partial results are merged with practice_orm.aggregates, so Avg,
+Min/Max and distinct counts come out exactly as a single query would return
+them.
+
+Workers read committed data only: rows written by an open transaction of the
+calling process are not visible to them. In-memory SQLite databases can't be
+shared between processes, and daemonic processes (multiprocessing pool
+workers, `manage.py test --parallel`) can't start a pool of their own, so the
+aggregate runs in-process for those.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.db import connections
+from django.db.models import Max, Min
+
+from practice_orm.aggregates import _named, combine, partial_aggregate
+
+
+def _init_worker():
+    if not apps.ready:
+        import django
+
+        django.setup()
+    # A forked worker inherits the parent's connection objects. SQLite
+    # handles must not be used across fork(), so drop them without closing.
+    for connection in connections.all(initialized_only=True):
+        connection.connection = None
+
+
+def _run_partial(task):
+    label, alias, query, lo, hi, aggregates = task
+    queryset = apps.get_model(label)._base_manager.using(alias).all()
+    queryset.query = query
+    return partial_aggregate(queryset.filter(pk__gte=lo, pk__lte=hi), **aggregates)
+
+
+def pk_ranges(lo, hi, parts):
+    step = max(1, -(-(hi - lo + 1) // parts))
+    return [(start, min(start + step - 1, hi)) for start in range(lo, hi + 1, step)]
+
+
+def parallel_aggregate(queryset, *args, workers=None, chunks_per_worker=4, **kwargs):
+    aggregates = _named(args, kwargs)
+    workers = workers or os.cpu_count() or 1
+    alias = queryset.db
+    connection = connections[alias]
+    in_memory = connection.vendor == 'sqlite' and connection.is_in_memory_db()
+    daemon = multiprocessing.current_process().daemon
+
+    bounds = queryset.order_by().aggregate(lo=Min('pk'), hi=Max('pk'))
+    if workers == 1 or in_memory or daemon or bounds['lo'] is None:
+        return combine([partial_aggregate(queryset, **aggregates)], **aggregates)
+
+    query = queryset.order_by().query
+    tasks = [
+        (queryset.model._meta.label, alias, query, lo, hi, aggregates)
+        for lo, hi in pk_ranges(bounds['lo'], bounds['hi'], workers * chunks_per_worker)
+    ]
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+    with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+        partials = list(pool.map(_run_partial, tasks))
+    return combine(partials, **aggregates)
@@ -258,3 +258,8 @@ def practice_orm():
     # Query 40: Filter Books by Title Count
     # q = Books.objects.all().annotate(count_title=Count('title')).filter(count_title__gt=1)
     # print(q)
+
+
+
+    # Uncomment one of the queries above to run it.
+    pass
@@ -281,6 +281,10 @@ for person in Person.objects.all():
 # DO
 Person.objects.update(age=0)
 
+# On big tables a single UPDATE holds the SQLite write lock until it finishes.
+# Update in short pk-range chunks instead (see practice_orm/mass_update.py)
+mass_update(Person.objects.all(), chunk_size=1000, age=F('age') + 1)
+
 
 # ---------------------------------------------------------------------------
 # 12. Use bulk_create() when possible.
@@ -0,0 +1,76 @@
+"""
+Bulk seeding of the practice_orm tables.
+
+    seed(authors=1000, publishers=100, books=1000000)
+
+Everything is inserted with bulk_create() in `batch_size` batches from a
+seeded random generator, so the same arguments always produce the same data.
+"""
+
+import datetime
+import random
+
+from practice_orm.models import Author, Books, Publisher, User
+
+
+FIRSTNAMES = ['Harry', 'Anna', 'Ram', 'Sita', 'John', 'Maya', 'Arjun', 'Leela', 'Tom', 'Nora']
+LASTNAMES = ['Potter', 'Sharma', 'Rana', 'Smith', 'Thapa', 'Brown', 'Gurung', 'Khan', 'Lee', 'Magar']
+GENRES = ['Fantasy', 'Fiction', 'History', 'Science', 'Poetry', 'Romance', 'Thriller', 'Biography']
+
+
+def random_date(rng, start_year=1990, end_year=2024):
+    start = datetime.date(start_year, 1, 1)
+    return start + datetime.timedelta(days=rng.randrange((datetime.date(end_year, 12, 31) - start).days))
+
+
+def make_books(rng, numbers, authors, publishers):
+    """Unsaved books titled 'Book <n>' for every n in `numbers`."""
+    return [
+        Books(
+            title='Book %d' % i,
+            genre=rng.choice(GENRES),
+            price=rng.randint(100, 5000),
+            published_date=random_date(rng),
+            author=rng.choice(authors),
+            publisher=rng.choice(publishers),
+        )
+        for i in numbers
+    ]
+
+
+def seed(authors=10, publishers=5, books=50, users=10, batch_size=2000, using=None, random_seed=0):
+    """Insert the given number of rows per model and return them as a dict of lists."""
+    rng = random.Random(random_seed)
+
+    def create(model, objs):
+        manager = model.objects if using is None else model.objects.using(using)
+        return manager.bulk_create(objs, batch_size=batch_size)
+
+    created = {}
+    created['users'] = create(User, [
+        User(username='user%d' % i, email='user%d@example.com' % i) for i in range(users)
+    ])
+    created['authors'] = create(Author, [
+        Author(
+            firstname=rng.choice(FIRSTNAMES),
+            lastname=rng.choice(LASTNAMES),
+            joindate=random_date(rng),
+            popularity_score=rng.randint(1, 10),
+        )
+        for _ in range(authors)
+    ])
+    created['publishers'] = create(Publisher, [
+        Publisher(
+            firstname=rng.choice(FIRSTNAMES),
+            lastname=rng.choice(LASTNAMES),
+            joindate=random_date(rng),
+            popularity_score=rng.randint(1, 10),
+        )
+        for _ in range(publishers)
+    ])
+    created['books'] = []
+    for start in range(0, books, batch_size):
+        created['books'] += create(Books, make_books(
+            rng, range(start, min(start + batch_size, books)), created['authors'], created['publishers'],
+        ))
+    return created
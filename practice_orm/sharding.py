@@ -0,0 +1,307 @@
+"""
+Horizontal partitioning of Books by publisher.
+
+`settings.BOOKS_SHARDS` lists the database aliases that hold Books rows. A
+book lives on `BOOKS_SHARDS[publisher_id % len(BOOKS_SHARDS)]`; Author,
+Publisher and User stay on 'default'. With a single shard (the default
+configuration) everything is on 'default' and nothing changes.
+`settings.BOOKS_SHARD_ALIASES` lists every shard database, including ones
+no longer in BOOKS_SHARDS that still need draining:
+
+    BOOKS_SHARD_COUNT=3 python manage.py migrate --database books_shard_1
+    BOOKS_SHARD_COUNT=3 python manage.py migrate --database books_shard_2
+    BOOKS_SHARD_COUNT=2 python manage.py rebalance_books --source books_shard_2
+
+Writing
+    `Books(...).save()`, `Books.objects.create()` and `bulk_create()` are
+    routed by `BooksShardRouter` from the instance's publisher.
+
+Reading
+    `books_for(publisher)` targets the one shard holding that publisher.
+    Anything else is scatter-gather: `scatter(queryset)` yields the
+    queryset on every shard, `scatter_count()` and `scatter_aggregate()`
+    merge the per shard results (Avg is merged from Sum and Count, see
+    practice_orm.aggregates).
+
+Caveats
+    Databases can't enforce foreign keys into another database, so
+    foreign key checks are switched off on the shard connections. Shards
+    only have the Books table: a join from Books into Author/Publisher
+    (`Books.objects.filter(author__...)`) raises OperationalError on any
+    alias but 'default'. Resolve the related ids on 'default' first and
+    filter by `author_id__in`/`publisher_id__in`.
+
+    Deleting an Author or Publisher deletes their books on the other shards
+    and the archive once the delete commits (`cascade_remote_books()`, a
+    pre_delete receiver; fast_delete does the same itself). The two
+    databases don't share a transaction, so a crash in between leaves
+    orphans, which `manage.py verify_archive` reports.
+
+    Each shard draws primary keys from its own range (see
+    `reserve_pk_range()`) so ids stay unique across shards, and books keep
+    their id when `manage.py rebalance_books` moves them, except for books
+    moved below the range of a shard still in use (`foreign_pk_ranges()`).
+"""
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from practice_orm.aggregates import combine, partial_aggregate
+
+
+# Every shard but 'default' starts its Books ids at index << PK_RANGE_BITS.
+PK_RANGE_BITS = 40
+
+
+def shard_aliases():
+    return list(getattr(settings, 'BOOKS_SHARDS', None) or ['default'])
+
+
+def all_shard_aliases():
+    """Every shard database, in use or waiting to be drained, in pk range order."""
+    aliases = getattr(settings, 'BOOKS_SHARD_ALIASES', None) or []
+    return aliases + [alias for alias in shard_aliases() if alias not in aliases]
+
+
+def is_shard(alias):
+    return alias != 'default' and alias in all_shard_aliases()
+
+
+def archive_alias():
+    """The archive database (see archive.py), None unless it is switched on."""
+    return getattr(settings, 'BOOKS_ARCHIVE_DATABASE', None)
+
+
+def holds_only_books(alias):
+    """Shards and the archive, switched on or not, store Books and nothing else."""
+    archives = {getattr(settings, 'BOOKS_ARCHIVE_ALIAS', None), archive_alias()} - {None}
+    return is_shard(alias) or alias in archives
+
+
+def remote_aliases():
+    """Every alias holding Books but 'default': the other shards and the archive."""
+    aliases = [alias for alias in shard_aliases() if alias != 'default']
+    if archive_alias():
+        aliases.append(archive_alias())
+    return aliases
+
+
+def shard_for(publisher):
+    """Alias of the shard holding the books of `publisher` (instance or pk)."""
+    publisher_id = getattr(publisher, 'pk', publisher)
+    aliases = shard_aliases()
+    return aliases[publisher_id % len(aliases)]
+
+
+def books_for(publisher):
+    from practice_orm.models import Books
+
+    return Books.objects.using(shard_for(publisher)).filter(publisher=publisher)
+
+
+def scatter(queryset):
+    for alias in shard_aliases():
+        yield queryset.using(alias)
+
+
+def sources(model):
+    """
+    Querysets that together hold every row of `model`: Books on every shard
+    and in the archive, the other models on 'default'.
+    """
+    from practice_orm.models import Books
+
+    if model is Books:
+        aliases = shard_aliases() + ([archive_alias()] if archive_alias() else [])
+        return [Books.objects.using(alias) for alias in aliases]
+    return [model.objects.all()]
+
+
+def scatter_list(queryset):
+    return [obj for shard in scatter(queryset) for obj in shard]
+
+
+def scatter_count(queryset):
+    return sum(shard.count() for shard in scatter(queryset))
+
+
+def scatter_aggregate(queryset, *args, **kwargs):
+    partials = [partial_aggregate(shard, *args, **kwargs) for shard in scatter(queryset)]
+    return combine(partials, *args, **kwargs)
+
+
+def books_fk(model):
+    """The foreign key from Books to `model` (Author or Publisher), None for other models."""
+    from practice_orm.models import Books
+
+    for field in Books._meta.concrete_fields:
+        if field.many_to_one and field.related_model is model:
+            return field
+    return None
+
+
+def delete_remote_books(model, ids, batch_size=500):
+    """Delete the books of the given Author or Publisher ids on every remote alias."""
+    from practice_orm.models import Books
+
+    column = books_fk(model).attname
+    ids = list(ids)
+    deleted = 0
+    for alias in remote_aliases():
+        for start in range(0, len(ids), batch_size):
+            books = Books.objects.using(alias).filter(**{column + '__in': ids[start:start + batch_size]})
+            deleted += books.delete()[0]
+    return deleted
+
+
+def cascade_remote_books(sender, instance, using, **kwargs):
+    """pre_delete receiver of Author and Publisher: delete their books on the remote aliases after commit."""
+    if holds_only_books(using) or not remote_aliases():
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: delete_remote_books(sender, [pk]), using=using, robust=True)
+
+
+def disable_foreign_keys(sender, connection, **kwargs):
+    """connection_created receiver: shards reference Author/Publisher rows living on 'default'."""
+    if connection.vendor == 'sqlite' and holds_only_books(connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA foreign_keys = OFF')
+
+
+def reserve_pk_range(using, **kwargs):
+    """post_migrate receiver: give every shard its own range of Books ids."""
+    from practice_orm.models import Books
+
+    if not is_shard(using) or connections[using].vendor != 'sqlite':
+        return
+    start = all_shard_aliases().index(using) << PK_RANGE_BITS
+    table = Books._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
+        elif row[0] < start:
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s', [start, table])
+
+
+def foreign_pk_ranges(target):
+    """
+    Indexes of the pk ranges `target` must not take ids from: those of the
+    shards in use above it. SQLite continues AUTOINCREMENT after the largest
+    id in the table, so such a row would make `target` hand out ids of that
+    shard's range. Ranges of drained shards and lower ones are safe.
+    """
+    aliases = all_shard_aliases()
+    if target not in aliases:
+        return []
+    index = aliases.index(target)
+    return [aliases.index(alias) for alias in shard_aliases() if aliases.index(alias) > index]
+
+
+def transfer_books(source, target, where, params=(), chunk_size=1000, keep_pk=False):
+    """
+    Move the Books rows of `source` matching the SQL condition `where` to
+    `target` and return how many were moved.
+
+    The target file is attached to the source connection, so every chunk's
+    INSERT and DELETE commit in one transaction. Moved rows get a new id on
+    the target unless `keep_pk` is set; even then rows from a range in
+    `foreign_pk_ranges(target)` get a new one.
+    """
+    from practice_orm.models import Books
+
+    connection = connections[source]
+    target_name = str(connections[target].settings_dict['NAME'])
+    if connection.vendor != 'sqlite' or connection.is_in_memory_db() or target_name == ':memory:':
+        raise ValueError('Moving books between databases needs file based SQLite databases.')
+
+    qn = connection.ops.quote_name
+    table = qn(Books._meta.db_table)
+    pk = qn(Books._meta.pk.column)
+    fields = [f for f in Books._meta.concrete_fields if not f.generated]
+    with_pk = ', '.join(qn(f.column) for f in fields)
+    without_pk = ', '.join(qn(f.column) for f in fields if not f.primary_key)
+    foreign = ', '.join(str(index) for index in foreign_pk_ranges(target))
+    if not keep_pk:
+        inserts = [(without_pk, '')]
+    elif foreign:
+        in_foreign = '(%s >> %d) IN (%s)' % (pk, PK_RANGE_BITS, foreign)
+        inserts = [(with_pk, ' AND NOT %s' % in_foreign), (without_pk, ' AND %s' % in_foreign)]
+    else:
+        inserts = [(with_pk, '')]
+    moved = 0
+
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        # Author/Publisher aren't on the attached database, its foreign keys can't be checked.
+        cursor.execute('PRAGMA foreign_keys')
+        foreign_keys = cursor.fetchone()[0]
+        cursor.execute('PRAGMA foreign_keys = OFF')
+        cursor.execute('ATTACH DATABASE %s AS transfer_target', [target_name])
+        try:
+            while True:
+                with transaction.atomic(using=source):
+                    cursor.execute(
+                        'SELECT %s FROM %s WHERE %s ORDER BY %s LIMIT %%s' % (pk, table, where, pk),
+                        list(params) + [chunk_size],
+                    )
+                    ids = [row[0] for row in cursor.fetchall()]
+                    if not ids:
+                        break
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    for columns, condition in inserts:
+                        cursor.execute(
+                            'INSERT INTO transfer_target.%s (%s) SELECT %s FROM main.%s WHERE %s IN (%s)%s'
+                            % (table, columns, columns, table, pk, placeholders, condition),
+                            ids,
+                        )
+                    cursor.execute('DELETE FROM main.%s WHERE %s IN (%s)' % (table, pk, placeholders), ids)
+                moved += len(ids)
+        finally:
+            cursor.execute('DETACH DATABASE transfer_target')
+            cursor.execute('PRAGMA foreign_keys = %d' % foreign_keys)
+    return moved
+
+
+class BooksShardRouter:
+    """Routes Books to the shard of its publisher and keeps the other models on 'default'."""
+
+    def _books_db(self, instance):
+        if instance._state.db and not instance._state.adding:
+            return instance._state.db
+        if instance.publisher_id is not None:
+            return shard_for(instance.publisher_id)
+        return None
+
+    def _route(self, model, hints):
+        if model._meta.app_label != 'practice_orm':
+            return None
+        instance = hints.get('instance')
+        if model._meta.model_name == 'books':
+            if instance is not None and instance._meta.model_name == 'books':
+                return self._books_db(instance)
+            if instance is not None and instance._meta.model_name == 'publisher':
+                return shard_for(instance)
+            return None
+        if instance is not None and holds_only_books(instance._state.db):
+            return 'default'
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if obj1._meta.app_label == obj2._meta.app_label == 'practice_orm':
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if not holds_only_books(db):
+            return None
+        # The change outbox (cdc.py) and mass_update checkpoints live next to the rows they record.
+        return app_label == 'practice_orm' and model_name in ('books', 'changeevent', 'massupdatecheckpoint')
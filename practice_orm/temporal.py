@@ -0,0 +1,111 @@
+"""
+Sargable date filters and monthly rollups.
+
+`joindate__day=12` or `joindate__month__in=[1, 2]` wrap the column in an
+extract function, which can't use an index and scans every row. Author,
+Publisher and Books keep the year, month and day of their date field in
+indexed, stored generated columns (`joindate_year`, `published_date_month`,
+...), and the `year`, `month` and `day` transforms of those date fields are
+replaced by ones that read the generated column instead:
+
+    Author.objects.filter(joindate__day__gte=12)
+    # WHERE "practice_orm_author"."joindate_day" >= 12
+
+`__year` comparisons against a literal (`joindate__year=2012`,
+`joindate__year__gt=2013`) keep Django's rewrite into a BETWEEN/range on the
+now indexed date column, and plain `joindate__gte=date(...)` filters use that
+index directly.
+
+For time range reports `MonthlyCount` holds the number of rows per month,
+archived books included (see sharding.sources()). Closed months don't
+change, so `refresh_monthly_counts(Books, since=...)`
+(or `manage.py refresh_rollups --since`) only regroups the recent ones;
+`monthly_counts(Books, start, end)` reads the rollup.
+"""
+
+import datetime
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.expressions import Col
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
+
+from practice_orm.models import Author, Books, MonthlyCount, Publisher
+from practice_orm.sharding import sources
+
+
+DATE_FIELDS = {
+    Author: 'joindate',
+    Publisher: 'joindate',
+    Books: 'published_date',
+}
+
+
+class GeneratedPartMixin:
+    """Compile to the `<field>_<part>` generated column when the model has one."""
+
+    def as_sql(self, compiler, connection):
+        if isinstance(self.lhs, Col):
+            name = '%s_%s' % (self.lhs.target.name, self.lookup_name)
+            opts = self.lhs.target.model._meta
+            if any(f.name == name and f.generated for f in opts.concrete_fields):
+                return compiler.compile(Col(self.lhs.alias, opts.get_field(name)))
+        return super().as_sql(compiler, connection)
+
+
+class GeneratedYear(GeneratedPartMixin, ExtractYear):
+    pass
+
+
+class GeneratedMonth(GeneratedPartMixin, ExtractMonth):
+    pass
+
+
+class GeneratedDay(GeneratedPartMixin, ExtractDay):
+    pass
+
+
+def register_lookups():
+    for model, field_name in DATE_FIELDS.items():
+        field = model._meta.get_field(field_name)
+        for transform in (GeneratedYear, GeneratedMonth, GeneratedDay):
+            field.register_lookup(transform)
+
+
+def first_of_month(day):
+    return day.replace(day=1)
+
+
+def refresh_monthly_counts(model, since=None):
+    """Regroup the rows of `model` per month, from the month of `since` on (everything by default)."""
+    field = DATE_FIELDS[model]
+    year, month = field + '_year', field + '_month'
+    counts = Counter()
+    for queryset in sources(model):
+        if since is not None:
+            queryset = queryset.filter(**{field + '__gte': first_of_month(since)})
+        rows = queryset.order_by().values(year, month).annotate(n=Count('pk')).values_list(year, month, 'n')
+        for y, m, n in rows:
+            counts[datetime.date(y, m, 1)] += n
+
+    label = model._meta.label
+    with transaction.atomic():
+        stale = MonthlyCount.objects.filter(model=label)
+        if since is not None:
+            stale = stale.filter(month__gte=first_of_month(since))
+        stale.delete()
+        MonthlyCount.objects.bulk_create([
+            MonthlyCount(model=label, month=month, count=n) for month, n in sorted(counts.items())
+        ])
+    return counts
+
+
+def monthly_counts(model, start=None, end=None):
+    """[(first day of month, rows)] from the rollup, months without rows left out."""
+    rows = MonthlyCount.objects.filter(model=model._meta.label)
+    if start is not None:
+        rows = rows.filter(month__gte=first_of_month(start))
+    if end is not None:
+        rows = rows.filter(month__lte=end)
+    return list(rows.order_by('month').values_list('month', 'count'))
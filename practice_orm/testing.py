@@ -0,0 +1,158 @@
+"""
+Fast test databases built from a seeded template.
+
+Migrating and seeding a fresh database for every test run gets slow once the
+suite has many ORM tests. `SnapshotTestRunner` (settings.TEST_RUNNER) does
+it once:
+
+1. The first run migrates each SQLite test database, seeds 'default' with
+   practice_orm.seed (SEED below) and saves the result as a template file in
+   the temp directory, named after a fingerprint of the migrations and SEED.
+2. Later runs copy that template into place and only run a no-op migrate.
+   Changing a migration, SEED or the code that fills the template (seed.py,
+   apps.py, which connects the post_migrate receivers, and those receivers
+   in cdc.py and sharding.py) changes the fingerprint, rebuilds it and
+   deletes the stale templates.
+3. `manage.py test --parallel N` gives every worker its own copy of the
+   file (Django's clone of a file based SQLite test database).
+
+Tests see the seeded rows. `TestCase` rolls each test back as usual.
+`SnapshotTransactionTestCase` restores the template with the SQLite backup
+API after every test instead of flushing, so the seed data survives.
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from functools import lru_cache
+
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+from django.test import TransactionTestCase
+from django.test.runner import DiscoverRunner
+
+from practice_orm import apps, cdc, seed as seed_module, sharding
+from practice_orm.seed import seed
+
+
+SEED = dict(authors=20, publishers=5, books=200, users=10)
+
+# Modules whose code ends up in the template besides the migrations.
+TEMPLATE_SOURCES = (seed_module, apps, cdc, sharding)
+
+
+@lru_cache
+def fingerprint():
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    digest = hashlib.sha1(repr(sorted(SEED.items())).encode())
+    for app_label, name in sorted(loader.graph.nodes):
+        digest.update(('%s.%s' % (app_label, name)).encode())
+        path = getattr(sys.modules[type(loader.graph.nodes[app_label, name]).__module__], '__file__', None)
+        if path:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+    for module in TEMPLATE_SOURCES:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def template_path(alias, key=None):
+    return os.path.join(tempfile.gettempdir(), 'practice_orm_template_%s_%s.sqlite3' % (alias, key or fingerprint()))
+
+
+def remove_stale_templates(alias):
+    """Delete the templates (and unfinished builds) of `alias` with another fingerprint."""
+    current = template_path(alias)
+    for path in glob.glob(template_path(alias, '?' * 12) + '*'):
+        if path != current:
+            os.remove(path)
+
+
+def test_db_path(alias):
+    return os.path.join(tempfile.gettempdir(), 'practice_orm_test_%s_%d.sqlite3' % (alias, os.getpid()))
+
+
+def copies_of(path):
+    """The test database file and the per worker clones `--parallel` made of it."""
+    root, ext = os.path.splitext(path)
+    return glob.glob(glob.escape(path)) + glob.glob('%s_*%s' % (glob.escape(root), ext))
+
+
+def copy_database(source, target):
+    """Copy one SQLite database into another with the backup API."""
+    src = sqlite3.connect(source) if isinstance(source, str) else source
+    dst = sqlite3.connect(target) if isinstance(target, str) else target
+    try:
+        src.backup(dst)
+    finally:
+        if isinstance(source, str):
+            src.close()
+        if isinstance(target, str):
+            dst.close()
+
+
+def restore_snapshot(alias):
+    connection = connections[alias]
+    connection.ensure_connection()
+    copy_database(template_path(alias), connection.connection)
+
+
+class SnapshotTestRunner(DiscoverRunner):
+    def build_template(self, alias):
+        connection = connections[alias]
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(self.verbosity, autoclobber=True, serialize=False, keepdb=True)
+        if alias == 'default':
+            seed(**SEED)
+        building = template_path(alias) + '.tmp'
+        connection.close()
+        copy_database(connection.settings_dict['NAME'], building)
+        os.replace(building, template_path(alias))
+        connection.creation.destroy_test_db(old_name, self.verbosity, keepdb=True)
+
+    def setup_databases(self, **kwargs):
+        self._snapshot_files = []
+        for alias in kwargs['aliases']:
+            connection = connections[alias]
+            if connection.vendor != 'sqlite':
+                continue
+            path = test_db_path(alias)
+            for stale in copies_of(path):
+                os.remove(stale)
+            connection.settings_dict['TEST']['NAME'] = path
+            self._snapshot_files.append(path)
+            if not os.path.exists(template_path(alias)):
+                remove_stale_templates(alias)
+                self.build_template(alias)
+            shutil.copyfile(template_path(alias), path)
+
+        # keepdb keeps the copied template instead of recreating the file;
+        # migrate finds nothing to apply.
+        keepdb, self.keepdb = self.keepdb, True
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            self.keepdb = keepdb
+
+    def teardown_databases(self, old_config, **kwargs):
+        super().teardown_databases(old_config, **kwargs)
+        if not self.keepdb:
+            for path in self._snapshot_files:
+                for name in copies_of(path):
+                    os.remove(name)
+
+
+class SnapshotTransactionTestCase(TransactionTestCase):
+    """TransactionTestCase that puts the seeded template back instead of flushing."""
+
+    def _fixture_teardown(self):
+        aliases = self._databases_names(include_mirrors=False)
+        if any(connections[alias].vendor != 'sqlite' for alias in aliases):
+            return super()._fixture_teardown()
+        for alias in aliases:
+            restore_snapshot(alias)
@@ -0,0 +1,94 @@
+import datetime
+
+from django.db import NotSupportedError
+from django.db.models import Count, Q
+from django.test import TestCase, override_settings
+
+from practice_orm.archive import archive_books, restore_books, verify_archive
+from practice_orm.fast_delete import fast_delete
+from practice_orm import sketches
+from practice_orm.models import Author, Books
+from practice_orm.temporal import refresh_monthly_counts
+from practice_orm.testing import SEED, SnapshotTransactionTestCase
+
+
+@override_settings(BOOKS_ARCHIVE_DATABASE='archive')
+class ArchiveTests(SnapshotTransactionTestCase):
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        dates = Books.objects.order_by('published_date').values_list('published_date', flat=True)
+        self.cutoff = dates[SEED['books'] // 2]
+        self.old = set(Books.objects.filter(published_date__lt=self.cutoff).values_list('pk', flat=True))
+
+    def test_archive_verify_restore(self):
+        ids = set(Books.objects.values_list('pk', flat=True))
+
+        self.assertEqual(archive_books(self.cutoff, chunk_size=30), {'default': len(self.old)})
+        self.assertEqual(set(Books.objects.using('archive').values_list('pk', flat=True)), self.old)
+        self.assertEqual(verify_archive(before=self.cutoff), {
+            'archived': len(self.old), 'duplicates': 0, 'orphans': 0, 'not_archived': 0, 'newer_than_cutoff': 0,
+        })
+
+        self.assertEqual(restore_books(ids=sorted(self.old)[:5]), 5)
+        self.assertEqual(restore_books(since=datetime.date(1900, 1, 1)), len(self.old) - 5)
+        self.assertEqual(set(Books.objects.values_list('pk', flat=True)), ids)
+        self.assertFalse(Books.objects.using('archive').exists())
+
+    def test_including_archive_queries(self):
+        author = Author.objects.first()
+        by_author = Books.objects.filter(author__lastname=author.lastname).count()
+        newest = list(Books.objects.order_by('published_date', '-pk').values_list('pk', flat=True)[:10])
+        archive_books(self.cutoff)
+
+        books = Books.objects.including_archive()
+        self.assertEqual(books.filter(author__lastname=author.lastname).count(), by_author)
+        self.assertEqual(list(books.order_by('published_date', '-pk').values_list('pk', flat=True)[:10]), newest)
+        self.assertEqual(books.order_by('published_date')[0].pk, newest[0])
+        self.assertEqual(books.aggregate(n=Count('pk')), {'n': SEED['books']})
+        with self.assertNumQueries(2), self.assertNumQueries(1, using='archive'):
+            authors = [book.author.lastname for book in books.select_related('author').order_by('published_date')[:20]]
+        self.assertEqual(len(authors), 20)
+        with self.assertRaises(NotSupportedError):
+            books.filter(Q(author__lastname=author.lastname)).count()
+
+    def test_including_archive_merges_distinct_rows(self):
+        genres = sorted(set(Books.objects.values_list('genre', flat=True)))
+        archive_books(self.cutoff)
+        hot = set(Books.objects.values_list('genre', flat=True))
+        self.assertTrue(hot & set(Books.objects.using('archive').values_list('genre', flat=True)))
+
+        distinct = Books.objects.values_list('genre', flat=True).distinct()
+        self.assertEqual(sorted(distinct.including_archive()), genres)
+        self.assertEqual(distinct.including_archive().count(), len(genres))
+        self.assertEqual(distinct.order_by('genre').including_archive()[:3], genres[:3])
+        self.assertEqual(Books.objects.values('genre').distinct().including_archive().count(), len(genres))
+        with self.assertRaises(NotSupportedError):
+            list(Books.objects.values('genre').annotate(n=Count('pk')).including_archive())
+        with self.assertRaises(NotSupportedError):
+            distinct.including_archive().aggregate(n=Count('genre'))
+
+    def test_rollups_and_sketches_include_archive(self):
+        archive_books(self.cutoff)
+        self.assertEqual(sum(refresh_monthly_counts(Books).values()), SEED['books'])
+        self.assertEqual(sketches.rebuild('books.genre').cms.total, SEED['books'])
+
+
+@override_settings(BOOKS_ARCHIVE_DATABASE=None)
+class ArchiveSwitchedOffTests(TestCase):
+    """Nothing touches the unmigrated archive database, the test would fail on any query to it."""
+
+    def test_reads_and_deletes_stay_on_hot_databases(self):
+        self.assertEqual(sum(refresh_monthly_counts(Books).values()), SEED['books'])
+        self.assertEqual(sketches.rebuild('books.genre').cms.total, SEED['books'])
+        self.assertEqual(Books.objects.including_archive().count(), SEED['books'])
+        first, second = Author.objects.filter(recommended_authors=None)[:2]
+        authors = [first.pk, second.pk]
+        with self.assertNoLogs('django', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            fast_delete(Author.objects.filter(pk=first.pk))
+            second.delete()
+        self.assertFalse(Books.objects.filter(author__in=authors).exists())
+
+    def test_archive_functions_refuse(self):
+        with self.assertRaisesMessage(ValueError, 'BOOKS_ARCHIVE=1'):
+            archive_books(datetime.date(2000, 1, 1))
@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test import TestCase
+
+from practice_orm.cdc import ChangeFeed, compact_changes, install_triggers
+from practice_orm.models import Author, Books, ChangeEvent, Publisher, User
+
+
+class ChangeFeedTests(TestCase):
+    def setUp(self):
+        self.feed = ChangeFeed('search', batch_size=50)
+        self.feed.ack(ChangeEvent.objects.latest('pk').pk)
+
+    def test_captures_writes_that_skip_signals(self):
+        author = Author.objects.first()
+        user = User.objects.first()
+        books = set(Books.objects.filter(author=author).values_list('pk', flat=True))
+        Books.objects.filter(author=author).update(title='Renamed')
+        author.followers.add(user)
+        Author.objects.filter(pk=author.pk).delete()
+
+        changes = {(c.table_name, c.op, c.row_id) for c in self.feed.poll()}
+        self.assertIn(('practice_orm_author', 'D', author.pk), changes)
+        self.assertTrue(books)
+        self.assertLessEqual(books, {pk for table, op, pk in changes if table == 'practice_orm_books' and op == 'D'})
+        follows = [c.data for c in self.feed.poll() if c.table_name == 'practice_orm_author_followers']
+        self.assertIn({'author_id': author.pk, 'user_id': user.pk}, follows)
+
+    def test_redelivers_until_acked_and_compacts(self):
+        publisher = Publisher.objects.first()
+        for name in ('a', 'b', 'c'):
+            Publisher.objects.filter(pk=publisher.pk).update(firstname=name)
+
+        batch = self.feed.poll()
+        self.assertEqual([(c.table_name, c.op, c.row_id) for c in batch], [('practice_orm_publisher', 'U', publisher.pk)])
+        self.assertEqual(self.feed.poll(), batch)
+
+        self.feed.ack(batch)
+        self.assertEqual(self.feed.poll(), [])
+        compact_changes()
+        self.assertEqual(ChangeEvent.objects.count(), 0)
+
+    def test_install_replaces_stale_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER cdc_practice_orm_user_insert')
+            cursor.execute('CREATE TRIGGER cdc_practice_orm_user_insert AFTER INSERT ON practice_orm_user BEGIN SELECT 1; END')
+        install_triggers('default')
+        User.objects.create(username='new', email='new@example.com')
+        self.assertEqual([(c.table_name, c.op) for c in self.feed.poll()], [('practice_orm_user', 'I')])
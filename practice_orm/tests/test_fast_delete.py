@@ -0,0 +1,52 @@
+import datetime
+
+from django.test import override_settings
+
+from practice_orm.fast_delete import fast_delete
+from practice_orm.models import Author, Books, Publisher, SketchDelta
+from practice_orm.testing import SEED, SnapshotTransactionTestCase
+
+
+@override_settings(BOOKS_ARCHIVE_DATABASE='archive')
+class FastDeleteTests(SnapshotTransactionTestCase):
+    databases = {'default', 'archive'}
+
+    def archived_book(self, author):
+        return Books.objects.using('archive').create(
+            title='Old', genre='History', published_date=datetime.date(1950, 1, 1),
+            author=author, publisher=Publisher.objects.first(),
+        )
+
+    def test_cascades_through_recommendation_chain(self):
+        first, second, third = Publisher.objects.order_by('pk')[:3]
+        Publisher.objects.filter(pk=second.pk).update(recommendedby=first)
+        Publisher.objects.filter(pk=third.pk).update(recommendedby=second)
+        books = Books.objects.filter(publisher__in=[first, second, third]).count()
+
+        deleted = fast_delete(Publisher.objects.filter(pk=first.pk))
+
+        self.assertEqual(deleted, (books + 3, {'practice_orm.Books': books, 'practice_orm.Publisher': 3}))
+        self.assertEqual(Publisher.objects.count(), SEED['publishers'] - 3)
+        genres = SketchDelta.objects.filter(name='books.genre').values_list('count', flat=True)
+        self.assertEqual(-sum(genres), books)
+
+    def test_cascades_to_archived_books(self):
+        author = Author.objects.filter(recommended_authors=None).first()
+        self.archived_book(author)
+        books = Books.objects.filter(author=author).count()
+
+        deleted = fast_delete(Author.objects.filter(pk=author.pk))
+
+        self.assertEqual(deleted[1]['practice_orm.Books'], books + 1)
+        self.assertFalse(Books.objects.using('archive').exists())
+
+    def test_delete_receiver_cascades_to_archived_books(self):
+        author = Author.objects.first()
+        self.archived_book(author)
+        Author.objects.filter(pk=author.pk).delete()
+        self.assertFalse(Books.objects.using('archive').exists())
+
+    def test_snapshot_restored_after_each_test(self):
+        self.assertEqual(Publisher.objects.count(), SEED['publishers'])
+        self.assertEqual(Books.objects.count(), SEED['books'])
+        self.assertFalse(Books.objects.using('archive').exists())
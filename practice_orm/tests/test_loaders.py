@@ -0,0 +1,34 @@
+import asyncio
+from unittest import mock
+
+from django.test import TestCase
+
+from practice_orm.loaders import Loaders
+from practice_orm.models import Author, Books
+
+
+class LoaderTests(TestCase):
+    def test_load_coalesces_into_one_query(self):
+        books = list(Books.objects.all())
+        loaders = Loaders()
+        with self.assertNumQueries(1):
+            pending = [loaders.author.load(book.author_id) for book in books]
+            authors = [p.get() for p in pending]
+            loaders.author.load_many([book.author_id for book in books])
+        self.assertEqual([a.pk for a in authors], [book.author_id for book in books])
+
+    def test_missing_key_is_none(self):
+        self.assertEqual(Loaders().publisher.load_many([0]), [None])
+
+    def test_aload_batches_within_one_tick(self):
+        ids = list(Author.objects.values_list('pk', flat=True))
+        loaders = Loaders()
+
+        async def load_all():
+            return await asyncio.gather(*(loaders.author.aload(pk) for pk in ids))
+
+        queryset = loaders.author.queryset
+        with mock.patch.object(queryset, 'ain_bulk', wraps=queryset.ain_bulk) as ain_bulk:
+            authors = asyncio.run(load_all())
+        self.assertEqual(ain_bulk.call_count, 1)
+        self.assertEqual([a.pk for a in authors], ids)
@@ -0,0 +1,44 @@
+from django.db.models import F
+from django.test import TestCase
+
+from practice_orm.mass_update import mass_update
+from practice_orm.models import Author, MassUpdateCheckpoint
+from practice_orm.testing import SEED
+
+
+class MassUpdateTests(TestCase):
+    def scores(self):
+        return dict(Author.objects.values_list('pk', 'popularity_score'))
+
+    def test_updates_in_chunks(self):
+        before = self.scores()
+        calls = []
+        done = mass_update(
+            Author.objects.all(), chunk_size=7, progress=lambda *args: calls.append(args),
+            popularity_score=F('popularity_score') + 1,
+        )
+        self.assertEqual(done, SEED['authors'])
+        self.assertEqual([c[0] for c in calls], [7, 14, 20])
+        self.assertEqual(self.scores(), {pk: score + 1 for pk, score in before.items()})
+
+    def test_resumes_after_crash_without_reapplying(self):
+        before = self.scores()
+
+        def crash(done, total, last_pk):
+            raise KeyboardInterrupt
+
+        updates = dict(popularity_score=F('popularity_score') + 1)
+        with self.assertRaises(KeyboardInterrupt):
+            mass_update(Author.objects.all(), chunk_size=7, checkpoint='bump', progress=crash, **updates)
+        self.assertEqual(MassUpdateCheckpoint.objects.count(), 1)
+        # Another update doesn't pick up the checkpoint of the interrupted one.
+        self.assertEqual(mass_update(Author.objects.all(), checkpoint='bump', zipcode=F('zipcode')), SEED['authors'])
+
+        self.assertEqual(mass_update(Author.objects.all(), chunk_size=7, checkpoint='bump', **updates), SEED['authors'] - 7)
+        self.assertEqual(self.scores(), {pk: score + 1 for pk, score in before.items()})
+        self.assertFalse(MassUpdateCheckpoint.objects.exists())
+
+    def test_empty_queryset_with_checkpoint(self):
+        updates = dict(popularity_score=F('popularity_score') + 1)
+        self.assertEqual(mass_update(Author.objects.filter(pk__in=[]), checkpoint='bump', **updates), 0)
+        self.assertFalse(MassUpdateCheckpoint.objects.exists())
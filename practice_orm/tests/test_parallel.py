@@ -0,0 +1,47 @@
+import multiprocessing
+from unittest import mock
+
+from django.db.models import Avg, Count, Max, Min, Q, Sum
+from django.test import TestCase
+
+from practice_orm import parallel
+from practice_orm.models import Books
+from practice_orm.parallel import parallel_aggregate, pk_ranges
+
+
+class ParallelAggregateTests(TestCase):
+    aggregates = {
+        'avg': Avg('price'),
+        'total': Sum('price'),
+        'first': Min('published_date'),
+        'highest': Max('price'),
+        'genres': Count('genre', distinct=True),
+        'authors': Count('author', distinct=True),
+    }
+
+    def assertMatchesSingleQuery(self, queryset, **kwargs):
+        expected = queryset.aggregate(**self.aggregates)
+        result = parallel_aggregate(queryset, **kwargs, **self.aggregates)
+        self.assertAlmostEqual(result.pop('avg'), expected.pop('avg'))
+        self.assertEqual(result, expected)
+
+    def test_pk_ranges_cover_uneven_bounds(self):
+        self.assertEqual(pk_ranges(1, 10, 3), [(1, 4), (5, 8), (9, 10)])
+        self.assertEqual(pk_ranges(5, 6, 4), [(5, 5), (6, 6)])
+
+    def test_matches_single_query_in_worker_processes(self):
+        if multiprocessing.current_process().daemon:
+            self.skipTest('manage.py test --parallel workers are daemonic and run the aggregate in-process.')
+        pks = sorted(Books.objects.values_list('pk', flat=True))
+        # The gap leaves the pk ranges with uneven numbers of rows, some none.
+        queryset = Books.objects.filter(Q(pk__lt=pks[20]) | Q(pk__gt=pks[120]))
+        pool = mock.patch.object(parallel, 'ProcessPoolExecutor', wraps=parallel.ProcessPoolExecutor)
+        with pool as executor:
+            self.assertMatchesSingleQuery(queryset, workers=2, chunks_per_worker=3)
+        self.assertEqual(executor.call_count, 1)
+
+    def test_runs_in_process_for_one_worker_and_empty_querysets(self):
+        with mock.patch.object(parallel, 'ProcessPoolExecutor') as executor:
+            self.assertMatchesSingleQuery(Books.objects.filter(genre='Poetry'), workers=1)
+            self.assertMatchesSingleQuery(Books.objects.none(), workers=2)
+        executor.assert_not_called()
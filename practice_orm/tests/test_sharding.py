@@ -0,0 +1,76 @@
+import datetime
+import io
+
+from django.core.management import call_command
+from django.db.models import Avg, Count, Max, Sum
+from django.test import TestCase, override_settings
+
+from practice_orm.aggregates import combine, partial_aggregate
+from practice_orm.loaders import Loaders
+from practice_orm.models import Author, Books, Publisher
+from practice_orm.sharding import PK_RANGE_BITS, scatter_aggregate, scatter_count, transfer_books
+from practice_orm.testing import SEED, SnapshotTransactionTestCase
+
+
+class AggregateTests(TestCase):
+    def test_combined_partials_match_single_query(self):
+        aggregates = {
+            'avg': Avg('price'),
+            'total': Sum('price'),
+            'highest': Max('price'),
+            'genres': Count('genre', distinct=True),
+            'author_sum': Sum('author_id', distinct=True),
+            'author_avg': Avg('author_id', distinct=True),
+        }
+        middle = Books.objects.order_by('pk').values_list('pk', flat=True)[SEED['books'] // 2]
+        parts = [
+            partial_aggregate(Books.objects.filter(pk__lt=middle), **aggregates),
+            partial_aggregate(Books.objects.filter(pk__gte=middle), **aggregates),
+        ]
+        expected = Books.objects.aggregate(**aggregates)
+        result = combine(parts, **aggregates)
+        self.assertAlmostEqual(result.pop('avg'), expected.pop('avg'))
+        self.assertAlmostEqual(result.pop('author_avg'), expected.pop('author_avg'))
+        self.assertEqual(result, expected)
+
+
+@override_settings(BOOKS_SHARDS=['default', 'books_shard_1'])
+class ShardingTests(SnapshotTransactionTestCase):
+    databases = {'default', 'books_shard_1'}
+
+    def create_book(self, publisher):
+        return Books.objects.create(
+            title='New', genre='Poetry', published_date=datetime.date(2020, 1, 1),
+            author=Author.objects.first(), publisher=publisher,
+        )
+
+    def odd_publisher(self):
+        return next(publisher for publisher in Publisher.objects.all() if publisher.pk % 2)
+
+    def test_router_scatter_and_loader(self):
+        book = self.create_book(self.odd_publisher())
+
+        self.assertEqual(book._state.db, 'books_shard_1')
+        self.assertEqual(book.pk >> PK_RANGE_BITS, 1)
+        self.assertEqual(scatter_count(Books.objects.all()), SEED['books'] + 1)
+        self.assertEqual(scatter_aggregate(Books.objects.all(), top=Max('pk'))['top'], book.pk)
+        self.assertEqual(Loaders().books.load_many([book.pk, 0]), [book, None])
+
+    def test_rebalance_and_drain_keep_ids(self):
+        ids = set(Books.objects.values_list('pk', flat=True))
+        odd = {pk for pk, publisher in Books.objects.values_list('pk', 'publisher_id') if publisher % 2}
+        self.assertTrue(odd)
+
+        call_command('rebalance_books', stdout=io.StringIO())
+        self.assertEqual(set(Books.objects.using('books_shard_1').values_list('pk', flat=True)), odd)
+
+        with override_settings(BOOKS_SHARDS=['default']):
+            call_command('rebalance_books', source=['books_shard_1'], stdout=io.StringIO())
+        self.assertEqual(set(Books.objects.values_list('pk', flat=True)), ids)
+        self.assertFalse(Books.objects.using('books_shard_1').exists())
+
+    def test_move_below_active_shard_gets_new_id(self):
+        book = self.create_book(self.odd_publisher())
+        transfer_books('books_shard_1', 'default', 'id = %s', [book.pk], keep_pk=True)
+        moved = Books.objects.get(title='New')
+        self.assertLess(moved.pk, 1 << PK_RANGE_BITS)
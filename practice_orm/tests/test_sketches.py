@@ -0,0 +1,124 @@
+import datetime
+import math
+import random
+from collections import Counter
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from practice_orm import sketches
+from practice_orm.sketches import CountMinSketch, HyperLogLog, SpaceSaving
+from practice_orm.models import Author, Sketch, SketchDelta
+
+
+class SketchTests(TestCase):
+    databases = {'default', 'archive'}
+
+    def setUp(self):
+        sketches.rebuild('author.lastname')
+        self.stored = Sketch.objects.get(name='author.lastname').data
+
+    def count(self, value):
+        return sketches.approx_count('author.lastname', value).value
+
+    def test_writes_append_deltas(self):
+        author = Author.objects.first()
+        old, base = author.lastname, self.count(author.lastname)
+        with self.captureOnCommitCallbacks(execute=True):
+            author.lastname = 'Zyx'
+            with self.assertNumQueries(1):
+                author.save()
+        self.assertEqual((self.count(old), self.count('Zyx')), (base - 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            author.lastname = 'Qat'
+            author.save()
+            author.save(update_fields=['firstname'])
+        self.assertEqual((self.count('Zyx'), self.count('Qat')), (0, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            author.delete()
+        self.assertEqual(self.count('Qat'), 0)
+        self.assertEqual(Sketch.objects.get(name='author.lastname').data, self.stored)
+
+    def test_flush_merges_deltas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Author.objects.create(firstname='A', lastname='Zyx', joindate=datetime.date(2020, 1, 1), popularity_score=1)
+        self.assertEqual(sketches.flush('author.lastname'), 1)
+        self.assertFalse(SketchDelta.objects.exists())
+        self.assertEqual(self.count('Zyx'), 1)
+        self.assertEqual(sketches.top_values('author.lastname', 100)[-1][0], 'Zyx')
+
+    def test_deltas_are_flushed_every_few_writes(self):
+        with mock.patch.object(sketches, 'FLUSH_EVERY', 3), self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                Author.objects.create(firstname='A%d' % i, lastname='Zyx', joindate=datetime.date(2020, 1, 1), popularity_score=1)
+        self.assertLess(SketchDelta.objects.count(), 3)
+        self.assertNotEqual(Sketch.objects.get(name='author.lastname').data, self.stored)
+        self.assertEqual(self.count('Zyx'), 5)
+
+    def test_failed_delta_write_does_not_fail_the_save(self):
+        with mock.patch.object(sketches, 'record_deltas', side_effect=Exception('database is locked')):
+            with self.assertLogs('django', 'ERROR'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Author.objects.filter(pk=Author.objects.first().pk).delete()
+
+
+class SummaryTests(SimpleTestCase):
+    def test_hyperloglog_accuracy(self):
+        for n in (100, 20000):
+            hll = HyperLogLog()
+            for i in range(n):
+                hll.add('value %d' % i)
+            estimate = hll.estimate()
+            self.assertLessEqual(abs(estimate.value - n), max(3 * estimate.error, 2), n)
+
+    def test_hyperloglog_merge_is_the_union(self):
+        left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(20000):
+            union.add(i)
+            if i < 12000:
+                left.add(i)
+            if i >= 8000:
+                right.add(i)
+        left.merge(right)
+        self.assertEqual(left.registers, union.registers)
+        with self.assertRaises(ValueError):
+            left.merge(HyperLogLog(precision=10))
+
+    def streams(self):
+        """Two skewed streams of values with their exact counts."""
+        left = Counter({'a': 100, 'b': 60, 'c': 30}) + Counter('left %d' % i for i in range(50))
+        right = Counter({'a': 40, 'b': 50, 'd': 35}) + Counter('right %d' % i for i in range(50))
+        return left, right, left + right
+
+    def test_count_min_merge(self):
+        left, right, both = self.streams()
+        merged, other = CountMinSketch(width=64), CountMinSketch(width=64)
+        for sketch, stream in ((merged, left), (other, right)):
+            for value, count in stream.items():
+                sketch.add(value, count)
+        merged.merge(other)
+        self.assertEqual(merged.total, sum(both.values()))
+        for value, count in both.items():
+            estimate = merged.estimate(value)
+            self.assertGreaterEqual(estimate.value, count)
+            self.assertLessEqual(estimate.value, count + math.ceil(estimate.error))
+        with self.assertRaises(ValueError):
+            merged.merge(CountMinSketch(width=32))
+
+    def test_space_saving_merge(self):
+        left, right, both = self.streams()
+        merged, other = SpaceSaving(capacity=8), SpaceSaving(capacity=8)
+        rng = random.Random(0)
+        for summary, stream in ((merged, left), (other, right)):
+            values = sorted(stream.elements())
+            rng.shuffle(values)
+            for value in values:
+                summary.add(value)
+        merged.merge(other)
+        top = merged.top(3)
+        self.assertEqual([value for value, _ in top], ['a', 'b', 'd'])
+        for value, (count, error) in top:
+            self.assertLessEqual(count - error, both[value])
+            self.assertLessEqual(both[value], count)
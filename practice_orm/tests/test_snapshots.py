@@ -0,0 +1,10 @@
+from django.test import TestCase
+
+from practice_orm.models import Author, Books
+from practice_orm.testing import SEED
+
+
+class SeedTests(TestCase):
+    def test_template_is_seeded(self):
+        self.assertEqual(Author.objects.count(), SEED['authors'])
+        self.assertEqual(Books.objects.count(), SEED['books'])
@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+from practice_orm.models import Author, Books
+
+
+class TemporalTests(TestCase):
+    def test_day_lookup_uses_generated_column(self):
+        queryset = Author.objects.filter(joindate__day__gte=12)
+        self.assertIn('"joindate_day" >= 12', str(queryset.query))
+        self.assertEqual(queryset.count(), sum(1 for a in Author.objects.all() if a.joindate.day >= 12))
+
+    def test_month_lookup_uses_month_index(self):
+        queryset = Author.objects.filter(joindate__month__in=[3, 4])
+        self.assertIn('USING INDEX author_joindate_month_idx', queryset.explain())
+        self.assertEqual(queryset.count(), sum(1 for a in Author.objects.all() if a.joindate.month in (3, 4)))
+
+    def test_year_lookups_use_an_index(self):
+        year = Books.objects.first().published_date.year
+        for lookup in ('published_date__year', 'published_date__year__gte'):
+            queryset = Books.objects.filter(**{lookup: year})
+            plan = queryset.explain()
+            self.assertIn('USING INDEX', plan)
+            self.assertNotIn('SCAN', plan)
+        self.assertEqual(
+            Books.objects.filter(published_date__year=year).count(),
+            sum(1 for b in Books.objects.all() if b.published_date.year == year),
+        )